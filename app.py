@@ -1,15 +1,41 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
-from sqlalchemy import text
+from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, stream_with_context, abort, g, has_request_context
+from flask import before_render_template, template_rendered
+from sqlalchemy import text, event, case, inspect as sa_inspect
+from sqlalchemy.orm import joinedload
+from markupsafe import Markup
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import Pool
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
+from datetime import datetime, date, timedelta
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial, wraps
+from collections import OrderedDict
 import os
+import re
+import queue
+import atexit
+import copy
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from werkzeug.security import generate_password_hash, check_password_hash
 import secrets
+import bisect
+import heapq
+import hashlib
+import gzip
+import csv
+import io
+import json
+import click
+import threading
+import time
 from urllib.parse import urlparse, unquote
-import pymysql
-from sqlalchemy import text
+try:
+    import brotli
+except ImportError:
+    brotli = None
 try:
     from dotenv import load_dotenv
     load_dotenv()
@@ -20,22 +46,6 @@ app = Flask(__name__, template_folder='templates')
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 db_url = os.environ.get('DATABASE_URL', 'sqlite:///movie_rental.db')
 
-# Ensure MySQL database exists if using MySQL
-if db_url.startswith('mysql'):  
-    parsed = urlparse(db_url)
-    db_name = unquote(parsed.path.lstrip('/'))
-    host = parsed.hostname or '127.0.0.1'
-    port = parsed.port or 3306
-    user = unquote(parsed.username or '')
-    password = unquote(parsed.password or '')
-    try:
-        conn = pymysql.connect(host=host, port=port, user=user, password=password)
-        with conn.cursor() as cur:
-            cur.execute(f"CREATE DATABASE IF NOT EXISTS `{db_name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci;")
-        conn.close()
-    except Exception as e:
-        print(f"[WARN] Could not ensure MySQL database exists: {e}")
-
 app.config['SQLALCHEMY_DATABASE_URI'] = db_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
@@ -43,29 +53,418 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_recycle': 1800,
 }
 app.config['READ_API_TOKEN'] = os.environ.get('READ_API_TOKEN', '')
+app.config['LANDING_STATS_TTL'] = float(os.environ.get('LANDING_STATS_TTL', '5'))
+app.config['IMPORT_CHUNK_SIZE'] = int(os.environ.get('IMPORT_CHUNK_SIZE', '1000'))
+app.config['IMPORT_HASH_WORKERS'] = int(os.environ.get('IMPORT_HASH_WORKERS', str(os.cpu_count() or 1)))
+app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['HASH_CONCURRENCY'] = int(os.environ.get('HASH_CONCURRENCY', str(os.cpu_count() or 2)))
+app.config['HASH_QUEUE_TIMEOUT'] = float(os.environ.get('HASH_QUEUE_TIMEOUT', '2'))
+app.config['POPULARITY_BATCH_SIZE'] = int(os.environ.get('POPULARITY_BATCH_SIZE', '5000'))
+app.config['RENTAL_DAYS'] = int(os.environ.get('RENTAL_DAYS', '3'))
+app.config['LATE_FEE_CENTS'] = int(os.environ.get('LATE_FEE_CENTS', '200'))
+app.config['OVERDUE_BATCH_SIZE'] = int(os.environ.get('OVERDUE_BATCH_SIZE', '1000'))
+app.config['RECOMMEND_TOP_K'] = int(os.environ.get('RECOMMEND_TOP_K', '20'))
+app.config['RECOMMEND_BATCH_SIZE'] = int(os.environ.get('RECOMMEND_BATCH_SIZE', '500'))
+# Off on Vercel, where background threads are frozen between invocations; run `flask refresh-recommendations` from cron instead
+app.config['RECOMMEND_AUTO_REFRESH'] = os.environ.get('RECOMMEND_AUTO_REFRESH', 'false' if os.environ.get('VERCEL') == '1' else 'true').lower() == 'true'
+app.config['RECOMMEND_REFRESH_DELAY'] = float(os.environ.get('RECOMMEND_REFRESH_DELAY', '5'))
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', '200'))
+app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', 'true').lower() == 'true'
+app.config['PAGE_CACHE_MAX'] = int(os.environ.get('PAGE_CACHE_MAX', '32'))
+app.config['RESPONSE_COMPRESSION'] = os.environ.get('RESPONSE_COMPRESSION', 'true').lower() == 'true'
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+app.config['AUTO_INIT_DB'] = os.environ.get('AUTO_INIT_DB', 'true').lower() == 'true'
+# Off on Vercel, where a function invocation is capped and billed for as long as a stream stays open
+app.config['STATS_STREAM'] = os.environ.get('STATS_STREAM', 'false' if os.environ.get('VERCEL') == '1' else 'true').lower() == 'true'
+app.config['STATS_STREAM_MAX_CLIENTS'] = int(os.environ.get('STATS_STREAM_MAX_CLIENTS', '100'))
+app.config['STATS_STREAM_HEARTBEAT'] = float(os.environ.get('STATS_STREAM_HEARTBEAT', '15'))
+app.config['STATS_STREAM_MAX_AGE'] = float(os.environ.get('STATS_STREAM_MAX_AGE', '300'))
+app.config['STATS_STREAM_POLL'] = float(os.environ.get('STATS_STREAM_POLL', '1'))
+# Read replicas: comma-separated URLs, registered as binds replica_0, replica_1, ...
+app.config['SQLALCHEMY_BINDS'] = {
+    f'replica_{i}': url for i, url in enumerate(
+        u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip())
+}
+app.config['REPLICA_CHECK_INTERVAL'] = float(os.environ.get('REPLICA_CHECK_INTERVAL', '10'))
+app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+
+class RoutingSession(FlaskSQLAlchemySession):
+    """Sends reads to the replica picked for the request (see replica_reads).
 
-db = SQLAlchemy(app)
+    Flushes and DML statements always go to the primary, and once a request
+    has written, the rest of it reads from the primary too. A statement that
+    fails on the replica is run again on the primary, so views never see
+    replica errors (see _replica_error).
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and g.get('db_replica') is not None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g.db_replica = None
+            else:
+                return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def execute(self, statement, *args, **kwargs):
+        try:
+            return super().execute(statement, *args, **kwargs)
+        except DBAPIError:
+            if not (has_request_context() and g.get('db_replica_failed')):
+                raise
+            # The replica is marked down and the request moved to the primary
+            g.db_replica_failed = False
+            inc_metric('cinerent_db_replica_fallbacks_total', replica=g.db_replica_key)
+            return super().execute(statement, *args, **kwargs)
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 
 # Logging configuration (Rotating file + console)
+# The file and console handlers run behind a QueueListener thread, so rotation
+# and disk stalls stay off the request thread. The queue is bounded: when it
+# is full, records are dropped and counted instead of blocking the caller.
+# LOG_FORMAT=json writes one JSON object per line with the request id, route
+# and duration. LOG_QUEUE_SIZE=0 logs synchronously, which is the default on
+# Vercel, where background threads are frozen between invocations.
 log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+log_format = os.environ.get('LOG_FORMAT', 'text').lower()
+log_queue_size = int(os.environ.get('LOG_QUEUE_SIZE', '0' if os.environ.get('VERCEL') == '1' else '10000'))
 logger = logging.getLogger('movie_rental')
 logger.setLevel(getattr(logging, log_level, logging.INFO))
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'route': getattr(record, 'route', None),
+        }
+        timing = getattr(record, 'timing', None)
+        if timing:
+            entry['duration_ms'] = timing['total_ms']
+            entry['timing'] = timing
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RequestContextFilter(logging.Filter):
+    # Logger-level filters run on the calling thread, before the record is
+    # queued, so the request context is still visible here
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.route = request.endpoint
+        else:
+            record.request_id = record.route = None
+        return True
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Keep the traceback separate from the message so each formatter
+        # decides how to render it
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+log_handler = None
+log_listener = None
+
+def _restart_log_listener():
+    # A forked worker inherits the listener but not its thread, and the
+    # inherited queue's waiters belong to the parent; records already queued
+    # are the parent's to write
+    if log_listener is not None:
+        log_handler.queue = log_listener.queue = queue.Queue(maxsize=log_queue_size)
+        log_listener._thread = None
+        log_listener.start()
+
 if not logger.handlers:
     # Use ephemeral /tmp for serverless (e.g., Vercel) to avoid write errors
     log_path = '/tmp/app.log' if os.environ.get('VERCEL') == '1' else 'app.log'
-    fmt = logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s')
+    fmt = JsonLinesFormatter() if log_format == 'json' else logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s')
+    handlers = []
     try:
         fh = RotatingFileHandler(log_path, maxBytes=1_000_000, backupCount=3)
         fh.setLevel(getattr(logging, log_level, logging.INFO))
         fh.setFormatter(fmt)
-        logger.addHandler(fh)
+        handlers.append(fh)
     except Exception:
         # Fallback to console-only logging if file handler fails
         pass
     ch = logging.StreamHandler()
     ch.setLevel(getattr(logging, log_level, logging.INFO))
     ch.setFormatter(fmt)
-    logger.addHandler(ch)
+    handlers.append(ch)
+    logger.addFilter(RequestContextFilter())
+    if log_queue_size > 0:
+        log_handler = BoundedQueueHandler(queue.Queue(maxsize=log_queue_size))
+        log_listener = QueueListener(log_handler.queue, *handlers, respect_handler_level=True)
+        log_listener.start()
+        atexit.register(log_listener.stop)
+        os.register_at_fork(after_in_child=_restart_log_listener)
+        logger.addHandler(log_handler)
+    else:
+        for h in handlers:
+            logger.addHandler(h)
+
+# Request instrumentation
+# Engine events count and time the statements run while a request is being
+# handled and template signals time rendering; the totals go out as a
+# Server-Timing header and on the request's log line. Statements slower than
+# SLOW_QUERY_MS are logged with the calling route and the shape (types, not
+# values) of their parameters.
+def param_shape(params, executemany=False):
+    if executemany:
+        return f'{len(params)} x {param_shape(params[0])}' if params else '0 rows'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{k}: {type(v).__name__}' for k, v in params.items()) + '}'
+    if isinstance(params, (list, tuple)):
+        return '(' + ', '.join(type(v).__name__ for v in params) + ')'
+    return type(params).__name__
+
+def current_route():
+    if has_request_context():
+        return f'{request.method} {request.endpoint or request.path}'
+    return f'thread:{threading.current_thread().name}'
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, which dies with the statement even
+    # when it fails and after_cursor_execute never runs
+    context._query_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = (time.perf_counter() - context._query_start) * 1000.0
+    if has_request_context():
+        g.sql_count = g.get('sql_count', 0) + 1
+        g.sql_ms = g.get('sql_ms', 0.0) + elapsed
+    if elapsed >= app.config['SLOW_QUERY_MS']:
+        logger.warning('Slow query %.1fms in %s: %s params=%s', elapsed, current_route(),
+                       ' '.join(statement.split())[:500], param_shape(parameters, executemany))
+
+@before_render_template.connect_via(app)
+def _render_started(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault('render_started', []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def _render_finished(sender, template, context, **extra):
+    stack = g.get('render_started') if has_request_context() else None
+    if stack:
+        started = stack.pop()
+        if not stack:  # nested renders are already inside the outer one
+            g.render_ms = g.get('render_ms', 0.0) + (time.perf_counter() - started) * 1000.0
+
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    incoming = request.headers.get('X-Request-ID', '')
+    g.request_id = incoming if REQUEST_ID_RE.match(incoming) else secrets.token_hex(8)
+
+@app.after_request
+def add_server_timing(resp):
+    started = g.get('request_started')
+    if started is None:
+        return resp
+    timing = {
+        'route': request.endpoint,
+        'status': resp.status_code,
+        'queries': g.get('sql_count', 0),
+        'db_ms': round(g.get('sql_ms', 0.0), 2),
+        'render_ms': round(g.get('render_ms', 0.0), 2),
+        'total_ms': round((time.perf_counter() - started) * 1000.0, 2),
+    }
+    observe_request(request.endpoint or 'unmatched', request.method, resp.status_code, timing['total_ms'] / 1000.0)
+    resp.headers['X-Request-ID'] = g.request_id
+    if app.config['SERVER_TIMING']:
+        resp.headers['Server-Timing'] = (
+            f"db;dur={timing['db_ms']};desc=\"{timing['queries']} queries\", "
+            f"render;dur={timing['render_ms']}, total;dur={timing['total_ms']}"
+        )
+    logger.info('%s %s -> %s: %d queries db=%.1fms render=%.1fms total=%.1fms',
+                request.method, request.path, resp.status_code, timing['queries'],
+                timing['db_ms'], timing['render_ms'], timing['total_ms'], extra={'timing': timing})
+    return resp
+
+# Metrics
+# Each thread records into its own shard with plain dict updates, so the hot
+# path takes no lock; /metrics sums the shards when scraped. Shards of
+# threads that have exited are folded into one retired shard whenever a new
+# thread registers and at scrape time, so thread-per-request servers keep
+# the list at the number of live threads.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_HELP = {
+    'cinerent_http_requests_total': ('counter', 'Requests handled, by route, method and status.'),
+    'cinerent_http_request_errors_total': ('counter', 'Requests that ended in a 5xx response.'),
+    'cinerent_http_request_duration_seconds': ('histogram', 'Request latency, by route and method.'),
+    'cinerent_db_pool_checkouts_total': ('counter', 'Connections checked out of the pool.'),
+    'cinerent_db_pool_connects_total': ('counter', 'New DBAPI connections opened by the pool.'),
+    'cinerent_db_pool_checked_out': ('gauge', 'Connections currently checked out.'),
+    'cinerent_db_pool_overflow': ('gauge', 'Connections open beyond pool_size.'),
+    'cinerent_rentals_total': ('counter', 'Checkout attempts, by result.'),
+    'cinerent_returns_total': ('counter', 'Rentals marked returned.'),
+    'cinerent_late_fees_total': ('counter', 'Late fees recorded by the overdue scanner.'),
+    'cinerent_logins_total': ('counter', 'Login attempts, by kind and result.'),
+    'cinerent_log_records_dropped_total': ('counter', 'Log records dropped because the log queue was full.'),
+    'cinerent_log_queue_depth': ('gauge', 'Log records waiting for the log writer thread.'),
+    'cinerent_page_cache_total': ('counter', 'Rendered page cache lookups, by result.'),
+    'cinerent_fragment_cache_total': ('counter', 'Catalog fragment cache lookups, by result.'),
+    'cinerent_stats_stream_clients': ('gauge', 'Open live stats streams.'),
+    'cinerent_stats_stream_events_total': ('counter', 'Stats snapshots pushed to stream clients.'),
+    'cinerent_db_routed_requests_total': ('counter', 'Read-only requests, by the database that served them.'),
+    'cinerent_db_replica_fallbacks_total': ('counter', 'Requests retried on the primary after a replica failed.'),
+    'cinerent_db_replica_healthy': ('gauge', 'Whether the last health check of a replica passed.'),
+}
+
+class MetricsShard:
+    __slots__ = ('thread', 'counters', 'histograms')
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.counters = {}
+        self.histograms = {}
+
+    def merge(self, other):
+        for key, value in other.counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, (buckets, total, count) in other.histograms.items():
+            mine = self.histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            mine[0] = [a + b for a, b in zip(mine[0], buckets)]
+            mine[1] += total
+            mine[2] += count
+
+_metrics_local = threading.local()
+_metrics_shards = []
+_metrics_retired = MetricsShard()
+_metrics_lock = threading.Lock()
+
+def _fold_dead_shards():
+    # Caller holds _metrics_lock; a dead thread no longer writes its shard
+    live = []
+    for shard in _metrics_shards:
+        if shard.thread.is_alive():
+            live.append(shard)
+        else:
+            _metrics_retired.merge(shard)
+    _metrics_shards[:] = live
+    return live
+
+def _metrics_shard():
+    shard = getattr(_metrics_local, 'shard', None)
+    if shard is None:
+        shard = _metrics_local.shard = MetricsShard(threading.current_thread())
+        with _metrics_lock:
+            _fold_dead_shards()
+            _metrics_shards.append(shard)
+    return shard
+
+def inc_metric(name, value=1, **labels):
+    counters = _metrics_shard().counters
+    key = (name, tuple(sorted(labels.items())))
+    counters[key] = counters.get(key, 0) + value
+
+def observe_request(route, method, status, seconds):
+    shard = _metrics_shard()
+    labels = (('method', method), ('route', route))
+    key = ('cinerent_http_requests_total', labels + (('status', str(status)),))
+    shard.counters[key] = shard.counters.get(key, 0) + 1
+    if status >= 500:
+        key = ('cinerent_http_request_errors_total', labels)
+        shard.counters[key] = shard.counters.get(key, 0) + 1
+    hist = shard.histograms.get(labels)
+    if hist is None:
+        hist = shard.histograms[labels] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+    hist[0][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    hist[1] += seconds
+    hist[2] += 1
+
+@event.listens_for(Pool, 'checkout')
+def _pool_checkout(dbapi_conn, record, proxy):
+    inc_metric('cinerent_db_pool_checkouts_total')
+
+@event.listens_for(Pool, 'connect')
+def _pool_connect(dbapi_conn, record):
+    inc_metric('cinerent_db_pool_connects_total')
+
+def collect_metrics():
+    with _metrics_lock:
+        live = _fold_dead_shards()
+        total = MetricsShard()
+        total.merge(_metrics_retired)
+    for shard in live:
+        # Copy first: the owning thread may be adding keys meanwhile
+        snapshot = MetricsShard()
+        snapshot.counters = dict(shard.counters)
+        snapshot.histograms = {k: [list(v[0]), v[1], v[2]] for k, v in list(shard.histograms.items())}
+        total.merge(snapshot)
+    for name, engine in db.engines.items():
+        pool = engine.pool
+        labels = (('engine', name or 'default'),)
+        if hasattr(pool, 'checkedout'):
+            total.counters[('cinerent_db_pool_checked_out', labels)] = pool.checkedout()
+        if hasattr(pool, 'overflow'):
+            total.counters[('cinerent_db_pool_overflow', labels)] = max(0, pool.overflow())
+    with _replica_lock:
+        for key, state in _replica_state.items():
+            total.counters[('cinerent_db_replica_healthy', (('replica', key),))] = int(state['healthy'])
+    total.counters[('cinerent_stats_stream_clients', ())] = len(_stream_subscribers)
+    if log_handler is not None:
+        total.counters[('cinerent_log_records_dropped_total', ())] = log_handler.dropped
+        total.counters[('cinerent_log_queue_depth', ())] = log_handler.queue.qsize()
+    return total
+
+def _metric_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def render_metrics(total):
+    lines = []
+    by_name = {}
+    for (name, labels), value in total.counters.items():
+        by_name.setdefault(name, []).append((labels, value))
+    for name, (kind, help_text) in METRIC_HELP.items():
+        if kind == 'histogram':
+            if not total.histograms:
+                continue
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            for labels, (buckets, seconds, count) in sorted(total.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS + ('+Inf',), buckets):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{_metric_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{_metric_labels(labels)} {seconds:.6f}')
+                lines.append(f'{name}_count{_metric_labels(labels)} {count}')
+            continue
+        if name not in by_name:
+            continue
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for labels, value in sorted(by_name[name]):
+            lines.append(f'{name}{_metric_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
 
 # Basic input sanitization helpers
 def sanitize_text(value: str, max_len: int = 255):
@@ -94,7 +493,39 @@ def to_int_in_range(value, default=10, min_v=1, max_v=100):
     except Exception:
         return default
 
-def require_read_token():
+# Keyset pagination for admin listings: seek past the last seen primary key
+# instead of OFFSET, so every page costs the same as the first one.
+ADMIN_PAGE_SIZE = 50
+ADMIN_PAGE_SIZE_MAX = 200
+
+def page_args():
+    after = request.args.get('after', type=int)
+    limit = to_int_in_range(request.args.get('limit', ADMIN_PAGE_SIZE), default=ADMIN_PAGE_SIZE, min_v=1, max_v=ADMIN_PAGE_SIZE_MAX)
+    descending = request.args.get('order', 'asc') == 'desc'
+    return after, limit, descending
+
+def keyset_page(query, key, after=None, limit=ADMIN_PAGE_SIZE, descending=False):
+    if after is not None:
+        query = query.filter(key < after if descending else key > after)
+    query = query.order_by(key.desc() if descending else key.asc())
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = getattr(rows[-1], key.key)
+    return rows, next_cursor
+
+def next_page_url(next_cursor):
+    if next_cursor is None:
+        return None
+    args = request.args.to_dict()
+    args['after'] = next_cursor
+    return url_for(request.endpoint, **args)
+
+def wants_json():
+    return request.args.get('format') == 'json'
+
+def require_read_token(allow_query=False):
     token = app.config.get('READ_API_TOKEN')
     if not token:
         return True
@@ -103,9 +534,69 @@ def require_read_token():
         provided = auth.split(' ', 1)[1]
         if secrets.compare_digest(provided, token):
             return True
+    # EventSource cannot send headers, so streams may pass ?token= instead
+    if allow_query and secrets.compare_digest(request.args.get('token', ''), token):
+        return True
     logger.warning('Unauthorized access to stats endpoint from %s', request.remote_addr)
     return False
 
+# Password hashing
+# Hashing and verification run on a small bounded pool so a login spike cannot
+# tie up every worker; callers that wait longer than HASH_QUEUE_TIMEOUT for a
+# slot get PasswordHasherBusy and answer 503 instead of queueing.
+class PasswordHasherBusy(Exception):
+    pass
+
+_hash_executor = None
+_hash_slots = None
+_hash_init_lock = threading.Lock()
+_hash_prefix = {}
+
+def _hash_pool():
+    global _hash_executor, _hash_slots
+    if _hash_executor is None:
+        with _hash_init_lock:
+            if _hash_executor is None:
+                size = max(1, app.config['HASH_CONCURRENCY'])
+                _hash_slots = threading.BoundedSemaphore(size)
+                _hash_executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='pwhash')
+    return _hash_executor, _hash_slots
+
+def run_hash_task(fn, *args, **kwargs):
+    executor, slots = _hash_pool()
+    if not slots.acquire(timeout=app.config['HASH_QUEUE_TIMEOUT']):
+        raise PasswordHasherBusy()
+    try:
+        return executor.submit(fn, *args, **kwargs).result()
+    finally:
+        slots.release()
+
+def hash_password(password):
+    return run_hash_task(generate_password_hash, password, method=app.config['PASSWORD_HASH_METHOD'])
+
+def password_needs_rehash(stored):
+    # Compare parameters (e.g. "scrypt:32768:8:1") against what the configured
+    # method expands to today; computed once per process from a throwaway hash
+    method = app.config['PASSWORD_HASH_METHOD']
+    if method not in _hash_prefix:
+        _hash_prefix[method] = generate_password_hash('x', method=method).split('$', 1)[0]
+    return stored.split('$', 1)[0] != _hash_prefix[method]
+
+def verify_password(stored, password):
+    """Return (matches, upgraded_hash_or_None)."""
+    if not run_hash_task(check_password_hash, stored, password):
+        return False, None
+    if password_needs_rehash(stored):
+        return True, hash_password(password)
+    return True, None
+
+def hasher_busy_response(template):
+    logger.warning('Password hasher saturated; rejecting login from %s', request.remote_addr)
+    if request.is_json:
+        return { 'status': 'danger', 'message': 'Server busy, please retry' }, 503, {'Retry-After': '1'}
+    flash('Server busy, please try again in a moment', 'danger')
+    return render_template(template), 503, {'Retry-After': '1'}
+
 # CSRF utilities
 def get_csrf_token():
     token = session.get('csrf_token')
@@ -123,12 +614,21 @@ def verify_csrf():
             return False
     return True
 
+# Templates mint the token lazily via csrf_token(): base.html only embeds it
+# for templates that set csrf_form (the ones that post), so other pages (and
+# the JSON API) leave the session untouched and send no Set-Cookie
+def template_csrf_token():
+    # Marks the response as carrying the token; see compress_response
+    g.csrf_in_body = True
+    return get_csrf_token()
+
+app.jinja_env.globals['csrf_token'] = template_csrf_token
+
 @app.before_request
 def before_request():
-    # Ensure CSRF token exists in session
-    get_csrf_token()
     # CSRF check
     if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
+        get_csrf_token()
         if not verify_csrf():
             return { 'status': 'danger', 'message': 'CSRF validation failed' }, 400
 
@@ -149,11 +649,18 @@ app.config['SESSION_COOKIE_SECURE'] = os.environ.get('SESSION_COOKIE_SECURE', 'f
 
 # Database Models
 class Movie(db.Model):
+    __table_args__ = (
+        db.Index('ix_movie_status_year', 'availability_status', 'release_year'),
+        db.Index('ix_movie_genre', 'genre'),
+    )
     movie_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     genre = db.Column(db.String(50), nullable=False)
     release_year = db.Column(db.Integer, nullable=False)
     availability_status = db.Column(db.String(20), default='Available')
+    stock = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    rentals_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_rented_at = db.Column(db.Date)
     rentals = db.relationship('Rental', backref='movie', lazy=True)
 
 class Customer(db.Model):
@@ -166,41 +673,325 @@ class Customer(db.Model):
     rentals = db.relationship('Rental', backref='customer', lazy=True)
 
 class Rental(db.Model):
+    __table_args__ = (
+        db.Index('ix_rental_customer_status', 'customer_id', 'rental_status'),
+        db.Index('ix_rental_movie', 'movie_id'),
+        db.Index('ix_rental_status_due', 'rental_status', 'due_date'),
+        db.Index('ix_rental_customer_movie', 'customer_id', 'movie_id'),
+    )
     rental_id = db.Column(db.Integer, primary_key=True)
     movie_id = db.Column(db.Integer, db.ForeignKey('movie.movie_id'), nullable=False)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.customer_id'), nullable=False)
     rental_date = db.Column(db.Date, nullable=False, default=datetime.utcnow)
     return_date = db.Column(db.Date)
+    due_date = db.Column(db.Date)
     rental_status = db.Column(db.String(20), default='Not Returned')
 
+class LateFee(db.Model):
+    __tablename__ = 'late_fees'
+    fee_id = db.Column(db.Integer, primary_key=True)
+    rental_id = db.Column(db.Integer, db.ForeignKey('rental.rental_id'), unique=True, nullable=False)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customer.customer_id'), nullable=False, index=True)
+    due_date = db.Column(db.Date, nullable=False)
+    amount_cents = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class MovieNeighbor(db.Model):
+    __tablename__ = 'movie_neighbors'
+    movie_id = db.Column(db.Integer, db.ForeignKey('movie.movie_id'), primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('movie.movie_id'), primary_key=True)
+    # Distinct customers who rented both movies
+    score = db.Column(db.Integer, nullable=False)
+
 class Admin(db.Model):
     admin_id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     password = db.Column(db.String(255), nullable=False)
 
-# Initialize database
-with app.app_context():
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer, primary_key=True)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class StatsCounter(db.Model):
+    __tablename__ = 'stats_counters'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+class JobCheckpoint(db.Model):
+    __tablename__ = 'job_checkpoints'
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+# Aggregate counters
+# Maintained by the flush hook below in the same transaction as the write
+# that changes them, so dashboards read four numbers instead of scanning.
+COUNTER_NAMES = ('total_movies', 'available_movies', 'total_customers', 'active_rentals')
+# Bumped (not counted) whenever something shown in the customer catalog changes
+CATALOG_VERSION = 'catalog_version'
+CATALOG_FIELDS = ('title', 'genre', 'release_year', 'availability_status')
+
+def _old_value(obj, attr):
+    hist = sa_inspect(obj).attrs[attr].history
+    if hist.deleted:
+        return hist.deleted[0]
+    return getattr(obj, attr)
+
+def _counter_deltas(obj, sign, movie_status, rental_status):
+    deltas = {}
+    if isinstance(obj, Movie):
+        deltas['total_movies'] = sign
+        if (movie_status or 'Available') == 'Available':
+            deltas['available_movies'] = sign
+    elif isinstance(obj, Customer):
+        deltas['total_customers'] = sign
+    elif isinstance(obj, Rental):
+        if (rental_status or 'Not Returned') == 'Not Returned':
+            deltas['active_rentals'] = sign
+    return deltas
+
+@event.listens_for(db.session, 'before_flush')
+def track_counter_changes(session, flush_context, instances):
+    totals = dict.fromkeys(COUNTER_NAMES + (CATALOG_VERSION,), 0)
+    for obj in session.new:
+        for k, v in _counter_deltas(obj, 1, getattr(obj, 'availability_status', None), getattr(obj, 'rental_status', None)).items():
+            totals[k] += v
+    for obj in session.deleted:
+        if isinstance(obj, (Movie, Customer, Rental)):
+            old_movie = _old_value(obj, 'availability_status') if isinstance(obj, Movie) else None
+            old_rental = _old_value(obj, 'rental_status') if isinstance(obj, Rental) else None
+            for k, v in _counter_deltas(obj, -1, old_movie, old_rental).items():
+                totals[k] += v
+    for obj in session.dirty:
+        if isinstance(obj, Movie):
+            attr, counter, active = 'availability_status', 'available_movies', 'Available'
+        elif isinstance(obj, Rental):
+            attr, counter, active = 'rental_status', 'active_rentals', 'Not Returned'
+        else:
+            continue
+        if obj in session.deleted:
+            continue
+        state = sa_inspect(obj)
+        if isinstance(obj, Movie) and any(state.attrs[f].history.has_changes() for f in CATALOG_FIELDS):
+            totals[CATALOG_VERSION] = 1
+        hist = state.attrs[attr].history
+        if not hist.has_changes():
+            continue
+        was = (hist.deleted[0] if hist.deleted else None) == active
+        now = (hist.added[0] if hist.added else None) == active
+        totals[counter] += int(now) - int(was)
+    if any(isinstance(obj, Movie) for obj in list(session.new) + list(session.deleted)):
+        totals[CATALOG_VERSION] = 1
+    apply_counter_deltas(session, totals)
+
+def apply_counter_deltas(session, totals):
+    # Also used directly by Core bulk writes, which bypass the flush hook
+    for name, delta in totals.items():
+        if delta:
+            session.execute(
+                StatsCounter.__table__.update()
+                .where(StatsCounter.name == name)
+                .values(value=StatsCounter.value + delta)
+            )
+    if totals.get(CATALOG_VERSION):
+        # The UPDATE holds the row until commit, so this is the exact version
+        # the transaction produces; the search index checks it after commit
+        version = session.execute(
+            db.select(StatsCounter.value).where(StatsCounter.name == CATALOG_VERSION)).scalar()
+        earlier = session.info.get('catalog_bump', (0, 0))[1]
+        session.info['catalog_bump'] = (version, earlier + totals[CATALOG_VERSION])
+
+def count_stats_from_tables():
+    # One round trip using scalar subqueries; only used for rebuilds
+    row = db.session.execute(db.select(
+        db.select(db.func.count()).select_from(Movie).scalar_subquery(),
+        db.select(db.func.count()).select_from(Movie).where(Movie.availability_status == 'Available').scalar_subquery(),
+        db.select(db.func.count()).select_from(Customer).scalar_subquery(),
+        db.select(db.func.count()).select_from(Rental).where(Rental.rental_status == 'Not Returned').scalar_subquery(),
+    )).one()
+    return dict(zip(COUNTER_NAMES, row))
+
+def reconcile_stats_counters(fix=True):
+    actual = count_stats_from_tables()
+    stored = {c.name: c.value for c in StatsCounter.query.all()}
+    drift = {}
+    for name in COUNTER_NAMES:
+        if stored.get(name) != actual[name]:
+            drift[name] = {'stored': stored.get(name), 'actual': actual[name]}
+            if fix:
+                db.session.merge(StatsCounter(name=name, value=actual[name]))
+    if fix:
+        db.session.commit()
+    return drift
+
+def get_stats_counters():
+    counters = {c.name: c.value for c in StatsCounter.query.all()}
+    if len(counters) < len(COUNTER_NAMES):
+        reconcile_stats_counters(fix=True)
+        counters = {c.name: c.value for c in StatsCounter.query.all()}
+    return counters
+
+@app.cli.command('reconcile-counters')
+@click.option('--dry-run', is_flag=True, help='Report drift without rewriting the counters.')
+def reconcile_counters_command(dry_run):
+    """Rebuild stats counters from the base tables and report drift."""
+    drift = reconcile_stats_counters(fix=not dry_run)
+    if not drift:
+        click.echo('Counters are in sync.')
+        return
+    for name, d in drift.items():
+        click.echo(f"{name}: stored={d['stored']} actual={d['actual']}")
+    click.echo('Reported drift only (dry run).' if dry_run else f'Rebuilt {len(drift)} counter(s).')
+
+# Schema migrations
+# Each step inspects the live schema first, so running it again is a no-op.
+def migrate_schema():
+    applied = []
     db.create_all()
-    # If using MySQL and tables already exist with smaller password columns, widen them
-    if db_url.startswith('mysql'):
-        try:
-            parsed = urlparse(db_url)
-            db_name = unquote(parsed.path.lstrip('/'))
-            host = parsed.hostname or '127.0.0.1'
-            port = parsed.port or 3306
-            user = unquote(parsed.username or '')
-            password = unquote(parsed.password or '')
-            conn = pymysql.connect(host=host, port=port, user=user, password=password, database=db_name)
-            with conn.cursor() as cur:
-                cur.execute("ALTER TABLE `admin` MODIFY `password` VARCHAR(255) NOT NULL;")
-                cur.execute("ALTER TABLE `customer` MODIFY `password` VARCHAR(255) NOT NULL;")
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"[WARN] Could not alter password columns (may be fresh schema): {e}")
+    insp = sa_inspect(db.engine)
+    if db.engine.dialect.name == 'mysql':
+        # Older deployments created the password columns narrower than a hash
+        for table in ('admin', 'customer'):
+            col = next((c for c in insp.get_columns(table) if c['name'] == 'password'), None)
+            if col is not None and (getattr(col['type'], 'length', None) or 0) < 255:
+                with db.engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE `{table}` MODIFY `password` VARCHAR(255) NOT NULL"))
+                applied.append(f'{table}.password VARCHAR(255)')
+                logger.info('Schema migration applied: widened %s.password', table)
+    movie_columns = {c['name'] for c in insp.get_columns('movie')}
+    if 'stock' not in movie_columns:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE movie ADD COLUMN stock INTEGER NOT NULL DEFAULT 1"))
+            conn.execute(text("UPDATE movie SET stock = 0 WHERE availability_status = 'Rented'"))
+        applied.append('movie.stock')
+        logger.info('Schema migration applied: added movie.stock')
+    if 'rentals_count' not in movie_columns:
+        # Filled in by the next popularity run, which starts with a full pass
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE movie ADD COLUMN rentals_count INTEGER NOT NULL DEFAULT 0"))
+            conn.execute(text("ALTER TABLE movie ADD COLUMN last_rented_at DATE"))
+        applied.append('movie.rentals_count')
+        logger.info('Schema migration applied: added movie.rentals_count and movie.last_rented_at')
+    if 'due_date' not in {c['name'] for c in insp.get_columns('rental')}:
+        # Only open rentals get a due date (at the default loan length); the
+        # overdue scanner never looks at returned ones
+        due = ("DATE_ADD(rental_date, INTERVAL :days DAY)" if db.engine.dialect.name == 'mysql'
+               else "date(rental_date, '+' || :days || ' days')")
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE rental ADD COLUMN due_date DATE"))
+            conn.execute(text(f"UPDATE rental SET due_date = {due} WHERE rental_status = 'Not Returned'"),
+                         {'days': app.config['RENTAL_DAYS']})
+        applied.append('rental.due_date')
+        logger.info('Schema migration applied: added rental.due_date')
+    for table in (Movie.__table__, Rental.__table__):
+        existing = {ix['name'] for ix in insp.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                applied.append(index.name)
+                logger.info('Schema migration applied: created index %s', index.name)
+    # ix_rental_status_due (rental_status, due_date) serves every lookup the
+    # old single-column index did, so keeping both only slows rental writes
+    if 'ix_rental_status' in {ix['name'] for ix in insp.get_indexes('rental')}:
+        on = ' ON rental' if db.engine.dialect.name == 'mysql' else ''
+        with db.engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX ix_rental_status{on}"))
+        applied.append('drop ix_rental_status')
+        logger.info('Schema migration applied: dropped redundant index ix_rental_status')
+    return applied
+
+# Hot queries and the index (or any of several) each one is expected to use
+def hot_queries():
+    return [
+        ('landing top available',
+         Movie.query.filter_by(availability_status='Available').order_by(Movie.release_year.desc()).limit(8),
+         'ix_movie_status_year'),
+        ('customer catalog',
+         Movie.query.filter_by(availability_status='Available'),
+         'ix_movie_status_year'),
+        ('customer rentals',
+         Rental.query.filter_by(customer_id=1),
+         ('ix_rental_customer_status', 'ix_rental_customer_movie')),
+        ('customer active rentals',
+         Rental.query.filter_by(customer_id=1, rental_status='Not Returned'),
+         'ix_rental_customer_status'),
+        ('rentals by movie',
+         Rental.query.filter_by(movie_id=1),
+         'ix_rental_movie'),
+        ('active rentals',
+         Rental.query.filter_by(rental_status='Not Returned').order_by(Rental.rental_id),
+         'ix_rental_status_due'),
+        ('overdue rentals',
+         overdue_query(date.today()),
+         'ix_rental_status_due'),
+        ('customer recommendations',
+         recommendations_query(1),
+         'ix_rental_customer_movie'),
+    ]
+
+def explain_query(query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)).mappings().all()
+        return ' | '.join(r['detail'] for r in rows)
+    rows = db.session.execute(text('EXPLAIN ' + sql)).mappings().all()
+    return ' | '.join(f"{r.get('table')}:{r.get('key')}" for r in rows)
+
+@app.cli.command('migrate-db')
+def migrate_db_command():
+    """Create missing tables and indexes and widen legacy columns."""
+    applied = migrate_schema()
+    if applied:
+        for step in applied:
+            click.echo(f'applied: {step}')
+    else:
+        click.echo('Schema is up to date.')
+
+@app.cli.command('check-indexes')
+def check_indexes_command():
+    """EXPLAIN each hot query and fail if it does not use its index."""
+    failed = 0
+    for name, query, index in hot_queries():
+        expected = (index,) if isinstance(index, str) else index
+        plan = explain_query(query)
+        ok = any(ix in plan for ix in expected)
+        failed += not ok
+        click.echo(f"{'ok  ' if ok else 'FAIL'} {name} -> {' or '.join(expected)}: {plan}")
+    if failed:
+        raise SystemExit(1)
+
+# Database bootstrap
+# Nothing here runs at import time: `flask init-db` (or the first request,
+# when AUTO_INIT_DB is on) creates the schema and seeds it, and later
+# processes only compare the version marker below.
+SCHEMA_VERSION = 6
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def ensure_database_exists():
+    # MySQL refuses connections to a missing database, so create it first
+    if not db_url.startswith('mysql'):
+        return
+    import pymysql
+    parsed = urlparse(db_url)
+    db_name = unquote(parsed.path.lstrip('/'))
+    host = parsed.hostname or '127.0.0.1'
+    port = parsed.port or 3306
+    user = unquote(parsed.username or '')
+    password = unquote(parsed.password or '')
+    try:
+        conn = pymysql.connect(host=host, port=port, user=user, password=password)
+        with conn.cursor() as cur:
+            cur.execute(f"CREATE DATABASE IF NOT EXISTS `{db_name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci;")
+        conn.close()
+    except Exception as e:
+        logger.warning('Could not ensure MySQL database exists: %s', e)
+
+def seed_demo_data():
     # Create default admin if not exists
     if not Admin.query.filter_by(username='admin').first():
-        admin = Admin(username='admin', password=generate_password_hash('admin123'))
+        admin = Admin(username='admin', password=generate_password_hash('admin123', method=app.config['PASSWORD_HASH_METHOD']))
         db.session.add(admin)
         db.session.commit()
 
@@ -222,11 +1013,1675 @@ with app.app_context():
             email='demo@example.com',
             phone='1234567890',
             address='123 Demo Street',
-            password=generate_password_hash('demo123')
+            password=generate_password_hash('demo123', method=app.config['PASSWORD_HASH_METHOD'])
         )
         db.session.add(demo_customer)
         db.session.commit()
 
+    if StatsCounter.query.count() < len(COUNTER_NAMES):
+        reconcile_stats_counters(fix=True)
+    if db.session.get(StatsCounter, CATALOG_VERSION) is None:
+        db.session.add(StatsCounter(name=CATALOG_VERSION, value=0))
+        db.session.commit()
+
+def current_schema_version():
+    try:
+        return db.session.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+    except Exception:
+        db.session.rollback()
+        return 0
+
+def bootstrap_database():
+    global _schema_ready
+    ensure_database_exists()
+    applied = migrate_schema()
+    seed_demo_data()
+    if current_schema_version() < SCHEMA_VERSION:
+        db.session.add(SchemaVersion(version=SCHEMA_VERSION))
+        db.session.commit()
+    _schema_ready = True
+    return applied
+
+@app.before_request
+def ensure_schema():
+    global _schema_ready
+    if _schema_ready or not app.config.get('AUTO_INIT_DB'):
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        version = current_schema_version()
+        if version < SCHEMA_VERSION:
+            logger.info('Schema at version %s, expected %s; bootstrapping', version, SCHEMA_VERSION)
+            bootstrap_database()
+        _schema_ready = True
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the database, apply migrations and seed demo data."""
+    applied = bootstrap_database()
+    for step in applied:
+        click.echo(f'applied: {step}')
+
+# Read replicas
+# GET views decorated with @replica_reads run against a replica picked
+# round-robin among the healthy ones; everything else uses the primary. A
+# replica is healthy when a probe can read its schema_version at the current
+# SCHEMA_VERSION; probes run at most every REPLICA_CHECK_INTERVAL seconds. If
+# a replica query fails mid-request, the replica is marked down (logged once,
+# when its state changes) and the statement runs again on the primary; a
+# failure outside the session's execute reruns the whole view there. A request that writes sets primary_until in the
+# session, so the same client reads its own writes from the primary for the
+# next REPLICA_STICKY_SECONDS.
+_replica_lock = threading.Lock()
+_replica_state = {}
+_replica_next = 0
+
+def replica_keys():
+    return sorted(k for k in app.config.get('SQLALCHEMY_BINDS', {}) if k.startswith('replica_'))
+
+def probe_replica(key):
+    """Return (healthy, error) for one replica bind."""
+    try:
+        with db.engines[key].connect() as conn:
+            version = conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar() or 0
+    except Exception as e:
+        return False, str(e).splitlines()[0][:200]
+    if version < SCHEMA_VERSION:
+        return False, f'schema version {version}, expected {SCHEMA_VERSION}'
+    return True, None
+
+def set_replica_health(key, healthy, error=None):
+    with _replica_lock:
+        state = _replica_state.setdefault(key, {'healthy': False, 'error': None, 'checked_at': None, 'probing': False})
+        changed = state['healthy'] != healthy or state['checked_at'] is None
+        state.update(healthy=healthy, error=error, checked_at=time.monotonic(), probing=False)
+    if changed and healthy:
+        logger.info('Replica %s is healthy', key)
+    elif changed:
+        logger.warning('Replica %s is unavailable: %s', key, error)
+
+def replica_healthy(key):
+    interval = app.config.get('REPLICA_CHECK_INTERVAL', 10)
+    with _replica_lock:
+        state = _replica_state.setdefault(key, {'healthy': False, 'error': None, 'checked_at': None, 'probing': False})
+        due = state['checked_at'] is None or time.monotonic() - state['checked_at'] >= interval
+        if not due or state['probing']:
+            # Another request is probing; go with the last known state meanwhile
+            return state['healthy']
+        state['probing'] = True
+    set_replica_health(key, *probe_replica(key))
+    return _replica_state[key]['healthy']
+
+def choose_replica():
+    """Return the bind key of the next healthy replica, or None for the primary."""
+    global _replica_next
+    keys = replica_keys()
+    if not keys:
+        return None
+    with _replica_lock:
+        start = _replica_next
+        _replica_next = (start + 1) % len(keys)
+    for i in range(len(keys)):
+        key = keys[(start + i) % len(keys)]
+        if replica_healthy(key):
+            return key
+    return None
+
+def replica_reads(view):
+    """Run a read-only GET view on a replica, falling back to the primary."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = None
+        if request.method in ('GET', 'HEAD') and not reads_pinned_to_primary():
+            key = choose_replica()
+        inc_metric('cinerent_db_routed_requests_total', target=key or 'primary')
+        if key is None:
+            return view(*args, **kwargs)
+        g.db_replica = db.engines[key]
+        g.db_replica_key = key
+        try:
+            rv = view(*args, **kwargs)
+        except Exception:
+            if not g.get('db_replica_failed'):
+                raise
+        if not g.get('db_replica_failed'):
+            return rv
+        # Views are read-only, so running one again on the primary is safe
+        logger.info('Replica %s failed during %s; retrying on the primary', key, request.endpoint)
+        inc_metric('cinerent_db_replica_fallbacks_total', replica=key)
+        db.session.rollback()
+        g.db_replica = None
+        g.db_replica_failed = False
+        return view(*args, **kwargs)
+    return wrapper
+
+def reads_pinned_to_primary():
+    # Only look at the session when there is a cookie, so anonymous requests
+    # (the landing page and its stats API) don't pick up Vary: Cookie
+    if app.config['SESSION_COOKIE_NAME'] not in request.cookies:
+        return False
+    return session.get('primary_until', 0) > time.time()
+
+@event.listens_for(Engine, 'handle_error')
+def _replica_error(context):
+    if not has_request_context() or g.get('db_replica') is None or context.engine is not g.db_replica:
+        return
+    key = next((k for k in replica_keys() if db.engines[k] is context.engine), None)
+    set_replica_health(key, False, str(context.original_exception).splitlines()[0][:200])
+    g.db_replica = None
+    g.db_replica_failed = True
+
+@event.listens_for(db.session, 'after_flush')
+def _note_flush_write(session, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _note_statement_write(orm_execute_state):
+    if has_request_context() and (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        g.db_wrote = True
+
+@app.after_request
+def pin_reads_after_write(resp):
+    if g.get('db_wrote') and replica_keys():
+        session['primary_until'] = round(time.time() + app.config.get('REPLICA_STICKY_SECONDS', 5), 3)
+    return resp
+
+@app.cli.command('sync-replicas')
+def sync_replicas_command():
+    """Copy the primary SQLite database onto the SQLite replicas (for local testing)."""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('sync-replicas only copies SQLite databases; use the server\'s replication otherwise')
+    keys = replica_keys()
+    if not keys:
+        raise click.ClickException('No replicas configured; set DATABASE_REPLICA_URLS')
+    copied = healthy = 0
+    source = db.engine.raw_connection()
+    try:
+        for key in keys:
+            engine = db.engines[key]
+            if engine.dialect.name != 'sqlite':
+                click.echo(f'{key}: skipped ({engine.dialect.name})')
+                continue
+            target = engine.raw_connection()
+            try:
+                source.driver_connection.backup(target.driver_connection)
+            finally:
+                target.close()
+            copied += 1
+            ok, error = probe_replica(key)
+            set_replica_health(key, ok, error)
+            healthy += ok
+            click.echo(f'{key}: copied, ' + ('healthy' if ok else f'unavailable: {error}'))
+    finally:
+        source.close()
+    click.echo(f'Copied the primary to {copied} of {len(keys)} replica(s); {healthy} healthy.')
+
+# Bulk import
+# Rows are streamed from CSV or NDJSON, validated with the same helpers as the
+# single-row forms and inserted with one executemany per chunk, each chunk in
+# its own transaction. Bad rows are reported without aborting the run.
+IMPORT_MAX_ERRORS = 100
+
+_import_executor = None
+_import_pool_lock = threading.Lock()
+
+def iter_import_rows(stream, fmt):
+    if fmt == 'csv':
+        for line_no, row in enumerate(csv.DictReader(stream), start=2):
+            yield line_no, row, None
+        return
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, 'expected a JSON object'
+            continue
+        # JSON numbers (a phone, a year) arrive as text from CSV and the forms
+        row = {k: v if v is None or isinstance(v, (str, dict, list)) else str(v) for k, v in row.items()}
+        yield line_no, row, None
+
+def clean_movie_row(row):
+    title = sanitize_text(row.get('title', ''), 100)
+    genre = sanitize_text(row.get('genre', ''), 50)
+    year = validate_year(row.get('release_year'))
+    stock = to_int_in_range(row.get('stock', 1), default=1, min_v=0, max_v=10000)
+    if not (title and genre and year):
+        raise ValueError('title, genre and a release_year between 1900 and 2100 are required')
+    return {'title': title, 'genre': genre, 'release_year': year, 'stock': stock,
+            'availability_status': 'Available' if stock > 0 else 'Rented'}
+
+def clean_customer_row(row):
+    name = sanitize_text(row.get('name', ''), 100)
+    email = sanitize_text(row.get('email', ''), 100)
+    phone = sanitize_text(row.get('phone', ''), 15)
+    address = sanitize_text(row.get('address', ''), 255)
+    pwd = row.get('password') or ''
+    if not (name and email and phone and address and pwd):
+        raise ValueError('name, email, phone, address and password are required')
+    return {'name': name, 'email': email, 'phone': phone, 'address': address, 'password': pwd}
+
+IMPORT_KINDS = {
+    'movies': (Movie, clean_movie_row),
+    'customers': (Customer, clean_customer_row),
+}
+
+def _import_counter_deltas(kind, rows):
+    if not rows:
+        # Nothing inserted: leave the catalog version (and the caches keyed on it) alone
+        return {}
+    if kind == 'movies':
+        return {
+            'total_movies': len(rows),
+            'available_movies': sum(1 for r in rows if r['availability_status'] == 'Available'),
+            CATALOG_VERSION: 1,
+        }
+    return {'total_customers': len(rows)}
+
+def _insert_chunk(kind, chunk, report):
+    model = IMPORT_KINDS[kind][0]
+    rows = [r for _, r in chunk]
+    try:
+        db.session.execute(model.__table__.insert(), rows)
+        apply_counter_deltas(db.session, _import_counter_deltas(kind, rows))
+        db.session.commit()
+        report['inserted'] += len(rows)
+        return
+    except Exception:
+        db.session.rollback()
+    # Something in the chunk was rejected (e.g. a duplicate email); retry row
+    # by row in savepoints so only the offending rows are reported
+    inserted = []
+    for line_no, row in chunk:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(model.__table__.insert(), [row])
+            inserted.append(row)
+        except Exception as e:
+            _record_import_error(report, line_no, str(getattr(e, 'orig', e)))
+    apply_counter_deltas(db.session, _import_counter_deltas(kind, inserted))
+    db.session.commit()
+    report['inserted'] += len(inserted)
+
+def _record_import_error(report, line_no, message):
+    report['failed'] += 1
+    if len(report['errors']) < IMPORT_MAX_ERRORS:
+        report['errors'].append({'line': line_no, 'error': message})
+
+def _import_pool(workers):
+    # One pool per process, shared by every import: forking workers per
+    # request is slow and restarts the log listener in each child. The first
+    # import sizes it.
+    global _import_executor
+    if _import_executor is None:
+        with _import_pool_lock:
+            if _import_executor is None:
+                _import_executor = ProcessPoolExecutor(max_workers=workers)
+    return _import_executor
+
+def bulk_import(kind, stream, fmt='csv', chunk_size=None, workers=None):
+    clean = IMPORT_KINDS[kind][1]
+    chunk_size = chunk_size or app.config['IMPORT_CHUNK_SIZE']
+    workers = workers or app.config['IMPORT_HASH_WORKERS']
+    report = {'kind': kind, 'inserted': 0, 'failed': 0, 'chunks': 0, 'errors': []}
+    pool = _import_pool(workers) if kind == 'customers' and workers > 1 else None
+
+    def flush(chunk):
+        if kind == 'customers':
+            # Hashing dominates the per-row cost, so fan it out across processes
+            passwords = [r['password'] for _, r in chunk]
+            hasher = partial(generate_password_hash, method=app.config['PASSWORD_HASH_METHOD'])
+            if pool and len(passwords) > workers:
+                hashed = list(pool.map(hasher, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+            else:
+                hashed = [hasher(p) for p in passwords]
+            for (_, r), h in zip(chunk, hashed):
+                r['password'] = h
+        _insert_chunk(kind, chunk, report)
+        report['chunks'] += 1
+
+    started = time.monotonic()
+    try:
+        chunk = []
+        for line_no, row, error in iter_import_rows(stream, fmt):
+            if error is None:
+                try:
+                    chunk.append((line_no, clean(row)))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                _record_import_error(report, line_no, error)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+    finally:
+        if report['inserted']:
+            invalidate_landing_stats()
+            if kind == 'movies':
+                invalidate_catalog_index()
+    report['seconds'] = round(time.monotonic() - started, 3)
+    logger.info('Bulk import %s: inserted=%s failed=%s chunks=%s in %ss',
+                kind, report['inserted'], report['failed'], report['chunks'], report['seconds'])
+    return report
+
+def import_format(filename, explicit=None):
+    if explicit in ('csv', 'ndjson'):
+        return explicit
+    if filename and filename.lower().endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(sorted(IMPORT_KINDS)))
+@click.argument('source', type=click.File('r', encoding='utf-8', lazy=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension, else csv.')
+@click.option('--chunk-size', type=int, help='Rows per transaction.')
+@click.option('--workers', type=int, help='Password hashing processes (customers only).')
+def import_data_command(kind, source, fmt, chunk_size, workers):
+    """Stream movies or customers from a CSV/NDJSON file (or - for stdin)."""
+    report = bulk_import(kind, source, import_format(source.name, fmt), chunk_size, workers)
+    click.echo(f"Inserted {report['inserted']} {kind}, {report['failed']} failed, "
+               f"{report['chunks']} chunk(s) in {report['seconds']}s")
+    for err in report['errors']:
+        click.echo(f"  line {err['line']}: {err['error']}")
+
+# Streaming export
+# Rows come off a server-side cursor (yield_per) and are encoded as they
+# arrive, so memory stays flat regardless of table size. since_id/since_date
+# restrict the read to rows newer than the last export.
+EXPORT_COLUMNS = {
+    'rentals': ['rental_id', 'rental_date', 'return_date', 'rental_status',
+                'movie_id', 'movie_title', 'movie_genre', 'customer_id', 'customer_name', 'customer_email'],
+    'customers': ['customer_id', 'name', 'email', 'phone', 'address'],
+}
+
+def export_query(kind, since_id=None, since_date=None):
+    if kind == 'rentals':
+        stmt = (db.select(Rental.rental_id, Rental.rental_date, Rental.return_date, Rental.rental_status,
+                          Movie.movie_id, Movie.title, Movie.genre,
+                          Customer.customer_id, Customer.name, Customer.email)
+                .join(Movie, Rental.movie_id == Movie.movie_id)
+                .join(Customer, Rental.customer_id == Customer.customer_id)
+                .order_by(Rental.rental_id))
+        if since_id is not None:
+            stmt = stmt.where(Rental.rental_id > since_id)
+        if since_date is not None:
+            stmt = stmt.where(Rental.rental_date >= since_date)
+    else:
+        stmt = (db.select(Customer.customer_id, Customer.name, Customer.email, Customer.phone, Customer.address)
+                .order_by(Customer.customer_id))
+        if since_id is not None:
+            stmt = stmt.where(Customer.customer_id > since_id)
+    return stmt.execution_options(yield_per=app.config['EXPORT_BATCH_SIZE'])
+
+def iter_export(kind, fmt='csv', since_id=None, since_date=None, progress=None):
+    columns = EXPORT_COLUMNS[kind]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if fmt == 'csv':
+        writer.writerow(columns)
+    pending = 0
+    for row in db.session.execute(export_query(kind, since_id, since_date)):
+        values = [v.isoformat() if hasattr(v, 'isoformat') else v for v in row]
+        if fmt == 'csv':
+            writer.writerow(values)
+        else:
+            buf.write(json.dumps(dict(zip(columns, values))) + '\n')
+        if progress is not None:
+            progress(row[0])
+        pending += 1
+        if pending >= 500:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    if buf.tell():
+        yield buf.getvalue()
+
+def parse_since_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+@app.cli.command('export-data')
+@click.argument('kind', type=click.Choice(sorted(EXPORT_COLUMNS)))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8', lazy=False), default='-')
+@click.option('--since-id', type=int, help='Only rows with an id greater than this.')
+@click.option('--since-date', help='Only rentals on or after this date (YYYY-MM-DD).')
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='File holding the last exported id; read as --since-id and updated afterwards.')
+def export_data_command(kind, fmt, output, since_id, since_date, checkpoint):
+    """Stream rentals or customers as CSV/NDJSON."""
+    if checkpoint and since_id is None and os.path.exists(checkpoint):
+        with open(checkpoint, encoding='utf-8') as f:
+            since_id = int(f.read().strip() or 0)
+    last = {'id': since_id, 'rows': 0}
+    def progress(row_id):
+        last['id'] = row_id
+        last['rows'] += 1
+    for chunk in iter_export(kind, fmt, since_id, parse_since_date(since_date), progress):
+        output.write(chunk)
+    output.flush()
+    if checkpoint and last['id'] is not None:
+        with open(checkpoint, 'w', encoding='utf-8') as f:
+            f.write(str(last['id']))
+    click.echo(f"Exported {last['rows']} {kind} row(s), last id {last['id']}", err=True)
+
+# Catalog search
+# An in-memory inverted index over movie titles and genres. Query tokens
+# match index terms exactly, by prefix (search-as-you-type) or within one
+# edit (typos), and matches are ranked by match quality and field. Each
+# process builds the index on its first request and keeps it current with
+# session hooks on its own Movie writes. The index remembers the
+# catalog_version it reflects; a lookup that finds the stored counter ahead
+# (another worker changed the catalog) rebuilds it.
+SEARCH_TOKEN_RE = re.compile(r'[a-z0-9]+')
+SEARCH_WEIGHTS = {'exact': 3.0, 'prefix': 2.0, 'fuzzy': 1.0}
+SEARCH_FIELD_WEIGHTS = (1.0, 0.6)  # title, genre
+SEARCH_MAX_PREFIX_TERMS = 64
+SEARCH_SCAN_LIMIT = 2000
+SEARCH_FILTER_SET_MAX = 20000
+SEARCH_MAX_QUERY_TOKENS = 8
+
+def search_tokens(text_value):
+    return SEARCH_TOKEN_RE.findall((text_value or '').lower())
+
+def _deletes(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+def _within_one_edit(a, b):
+    # Levenshtein distance <= 1, plus adjacent transpositions
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diff = [i for i in range(la) if a[i] != b[i]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if la > lb:
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
+
+class CatalogSearchIndex:
+    def __init__(self):
+        self.docs = {}
+        self.postings = {}
+        self.vocab = []
+        self.deletes = {}
+        self.built_at = time.monotonic()
+        self.version = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, movie_id, title, genre, release_year, availability_status):
+        if movie_id in self.docs:
+            self.remove(movie_id)
+        title_tokens = tuple(dict.fromkeys(search_tokens(title)))
+        genre_tokens = tuple(dict.fromkeys(search_tokens(genre)))
+        self.docs[movie_id] = (title, genre, release_year, availability_status, title_tokens, genre_tokens)
+        for term in set(title_tokens + genre_tokens):
+            posting = self.postings.get(term)
+            if posting is None:
+                # dicts double as insertion-ordered sets
+                posting = self.postings[term] = {}
+                bisect.insort(self.vocab, term)
+                if len(term) >= 4:
+                    for d in _deletes(term) | {term}:
+                        self.deletes.setdefault(d, set()).add(term)
+            posting[movie_id] = None
+
+    def remove(self, movie_id):
+        doc = self.docs.pop(movie_id, None)
+        if doc is None:
+            return
+        for term in set(doc[4] + doc[5]):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(movie_id, None)
+            if not posting:
+                del self.postings[term]
+                i = bisect.bisect_left(self.vocab, term)
+                if i < len(self.vocab) and self.vocab[i] == term:
+                    del self.vocab[i]
+                if len(term) >= 4:
+                    for d in _deletes(term) | {term}:
+                        terms = self.deletes.get(d)
+                        if terms:
+                            terms.discard(term)
+                            if not terms:
+                                del self.deletes[d]
+
+    def _expand(self, token, prefix=True):
+        # term -> weight for every index term this query token can match
+        matches = {}
+        if token in self.postings:
+            matches[token] = SEARCH_WEIGHTS['exact']
+        if prefix and len(token) >= 2:
+            i = bisect.bisect_left(self.vocab, token)
+            for term in self.vocab[i:i + SEARCH_MAX_PREFIX_TERMS]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, SEARCH_WEIGHTS['prefix'])
+        if len(token) >= 4:
+            candidates = set(self.deletes.get(token, ()))
+            for d in _deletes(token):
+                candidates.update(self.deletes.get(d, ()))
+            for term in candidates:
+                if term not in matches and _within_one_edit(token, term):
+                    matches[term] = SEARCH_WEIGHTS['fuzzy']
+        return matches
+
+    def search(self, query, limit=20, offset=0, available_only=False):
+        """Return (movie dicts, has_more) for one page of ranked matches."""
+        tokens = list(dict.fromkeys(search_tokens(query)))[:SEARCH_MAX_QUERY_TOKENS]
+        if not tokens:
+            return [], False
+        # Only the last token is still being typed, so only it matches by prefix
+        expansions = [self._expand(t, prefix=(i == len(tokens) - 1)) for i, t in enumerate(tokens)]
+        if not all(expansions):
+            return [], False
+        # Drive candidate generation from the most selective token, visiting
+        # its terms best weight first. A bounded min-heap keeps the current
+        # top page; scanning stops once nothing unvisited can outscore it.
+        sizes = [sum(len(self.postings[t]) for t in e) for e in expansions]
+        driver_size = min(sizes)
+        driver = expansions[sizes.index(driver_size)]
+        others_best = sum(max(e.values()) for e in expansions if e is not driver) * SEARCH_FIELD_WEIGHTS[0]
+        # Other tokens whose posting lists are not much larger than the
+        # driver's become id sets, so candidates that cannot match every token
+        # are dropped before scoring; building a set per id beats scoring
+        filters = []
+        for expansion, size in zip(expansions, sizes):
+            if expansion is not driver and size <= min(SEARCH_FILTER_SET_MAX, 16 * driver_size):
+                ids = set()
+                for term in expansion:
+                    ids.update(self.postings[term])
+                filters.append(ids)
+        need = offset + limit + 1
+        top = []
+        seen = set()
+        scanned = visited = 0
+        for term, weight in sorted(driver.items(), key=lambda kv: -kv[1]):
+            bound = weight * SEARCH_FIELD_WEIGHTS[0] + others_best
+            if (len(top) >= need and top[0][0] >= bound) or scanned >= SEARCH_SCAN_LIMIT or visited >= 20 * SEARCH_SCAN_LIMIT:
+                break
+            for movie_id in self.postings[term]:
+                if movie_id in seen:
+                    continue
+                seen.add(movie_id)
+                visited += 1
+                if filters and not all(movie_id in ids for ids in filters):
+                    continue
+                scanned += 1
+                doc = self.docs[movie_id]
+                if available_only and doc[3] != 'Available':
+                    continue
+                score = self._score(doc, expansions)
+                if not score:
+                    continue
+                # Ties go to tighter titles, then newer releases
+                entry = (score, -len(doc[4]), doc[2] or 0, -movie_id)
+                if len(top) < need:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+                if len(top) >= need and top[0][0] >= bound:
+                    break
+        ranked = sorted(top, reverse=True)
+        page = ranked[offset:offset + limit]
+        results = []
+        for score, _, _, neg_id in page:
+            title, genre, year, status = self.docs[-neg_id][:4]
+            results.append({
+                'movie_id': -neg_id,
+                'title': title,
+                'genre': genre,
+                'release_year': year,
+                'availability_status': status,
+                'score': round(score, 2),
+            })
+        return results, len(ranked) > offset + limit
+
+    @staticmethod
+    def _score(doc, expansions):
+        score = 0.0
+        for expansion in expansions:
+            best = 0.0
+            for field_weight, field_tokens in zip(SEARCH_FIELD_WEIGHTS, (doc[4], doc[5])):
+                for tok in field_tokens:
+                    w = expansion.get(tok)
+                    if w and w * field_weight > best:
+                        best = w * field_weight
+            if not best:
+                return 0.0
+            score += best
+        return score
+
+def build_catalog_index(version=None):
+    index = CatalogSearchIndex()
+    # Read first: a change committed during the scan leaves the index behind
+    # the counter, so the next lookup rebuilds rather than missing it
+    index.version = get_catalog_version() if version is None else version
+    stmt = (db.select(Movie.movie_id, Movie.title, Movie.genre, Movie.release_year, Movie.availability_status)
+            .execution_options(yield_per=app.config['EXPORT_BATCH_SIZE']))
+    for row in db.session.execute(stmt):
+        index.add(*row)
+    return index
+
+_catalog_index = None
+_catalog_index_lock = threading.Lock()
+
+def get_catalog_index():
+    global _catalog_index
+    version = get_catalog_version()
+    if _catalog_index is None or _catalog_index.version < version:
+        with _catalog_index_lock:
+            if _catalog_index is None or _catalog_index.version < version:
+                started = time.monotonic()
+                _catalog_index = build_catalog_index(version)
+                logger.info('Catalog search index built: %s movies at catalog version %s in %.2fs',
+                            len(_catalog_index), _catalog_index.version, time.monotonic() - started)
+    return _catalog_index
+
+_catalog_index_warm = False
+
+@app.before_request
+def warm_catalog_index():
+    # Once per process, so the first search does not pay for the build
+    global _catalog_index_warm
+    if _catalog_index_warm:
+        return
+    _catalog_index_warm = True
+    try:
+        get_catalog_index()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning('Catalog search index not built at startup (%s); building on first search', e)
+
+def invalidate_catalog_index():
+    # For writes that bypass the ORM (bulk import); rebuilt on next search
+    global _catalog_index
+    with _catalog_index_lock:
+        _catalog_index = None
+
+def note_search_change(session, movie, deleted=False):
+    changes = session.info.setdefault('search_changes', {})
+    if deleted:
+        changes[movie.movie_id] = None
+    else:
+        changes[movie.movie_id] = (movie.title, movie.genre, movie.release_year, movie.availability_status or 'Available')
+
+@event.listens_for(db.session, 'after_flush')
+def collect_search_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Movie):
+            note_search_change(session, obj)
+    for obj in session.deleted:
+        if isinstance(obj, Movie):
+            note_search_change(session, obj, deleted=True)
+
+@event.listens_for(db.session, 'after_commit')
+def apply_search_changes(session):
+    changes = session.info.pop('search_changes', None)
+    bump = session.info.pop('catalog_bump', None)
+    if not (changes or bump) or _catalog_index is None:
+        return
+    with _catalog_index_lock:
+        index = _catalog_index
+        if index is None:
+            return
+        if bump is not None:
+            version, delta = bump
+            if index.version != version - delta:
+                # Someone else changed the catalog too; the next lookup rebuilds
+                return
+            index.version = version
+        for movie_id, fields in (changes or {}).items():
+            if fields is None:
+                index.remove(movie_id)
+            else:
+                index.add(movie_id, *fields)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def discard_search_changes(session, previous_transaction):
+    session.info.pop('search_changes', None)
+    session.info.pop('catalog_bump', None)
+
+# Rental service
+# Checkout takes a copy with a single conditional UPDATE (compare-and-set on
+# stock) and trusts the affected row count, so two customers can never get
+# the same last copy and no row lock is held across statements. It behaves
+# the same on SQLite and MySQL; returns are guarded the same way. A title an
+# admin marks 'Rented' is held back even if copies remain.
+class RentalError(Exception):
+    pass
+
+class RentalUnavailable(RentalError):
+    pass
+
+class RentalNotFound(RentalError):
+    pass
+
+RENTAL_DAYS_MAX = 60
+
+def due_date_for(days=None):
+    return datetime.now().date() + timedelta(days=days or app.config['RENTAL_DAYS'])
+
+def checkout_movie(movie_id, customer_id, days=None):
+    """Take one copy of movie_id for customer_id for `days` days; caller commits."""
+    taken = db.session.execute(
+        db.update(Movie)
+        .where(Movie.movie_id == movie_id, Movie.stock > 0, Movie.availability_status == 'Available')
+        # availability first: MySQL applies SET clauses left to right
+        .ordered_values(
+            (Movie.availability_status, case((Movie.stock > 1, 'Available'), else_='Rented')),
+            (Movie.stock, Movie.stock - 1),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if taken != 1:
+        if db.session.get(Movie, movie_id) is None:
+            raise RentalNotFound('Movie not found')
+        raise RentalUnavailable('Movie is not available')
+    movie = db.session.get(Movie, movie_id, populate_existing=True)
+    if movie.stock == 0:
+        apply_counter_deltas(db.session, {'available_movies': -1, CATALOG_VERSION: 1})
+    note_search_change(db.session, movie)
+    rental = Rental(movie_id=movie_id, customer_id=customer_id, rental_date=datetime.now().date(),
+                    due_date=due_date_for(days), rental_status='Not Returned')
+    db.session.add(rental)
+    db.session.flush()
+    return rental
+
+def return_rental_copy(rental_id):
+    """Mark rental_id returned and put its copy back; caller commits."""
+    rental = db.session.get(Rental, rental_id)
+    if rental is None:
+        raise RentalNotFound('Rental not found')
+    closed = db.session.execute(
+        db.update(Rental)
+        .where(Rental.rental_id == rental_id, Rental.rental_status == 'Not Returned')
+        .values(rental_status='Returned', return_date=datetime.now().date())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if closed != 1:
+        raise RentalError('Rental is already returned')
+    # Locked until commit, so nothing changes the status between this read and the UPDATE
+    was = db.session.execute(
+        db.select(Movie.availability_status).where(Movie.movie_id == rental.movie_id).with_for_update()
+    ).scalar()
+    db.session.execute(
+        db.update(Movie)
+        .where(Movie.movie_id == rental.movie_id)
+        # Only a title that ran out of copies comes back; an admin hold stays.
+        # Availability first: MySQL applies SET clauses left to right
+        .ordered_values(
+            (Movie.availability_status, case((Movie.stock == 0, 'Available'), else_=Movie.availability_status)),
+            (Movie.stock, Movie.stock + 1),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    movie = db.session.get(Movie, rental.movie_id, populate_existing=True)
+    deltas = {'active_rentals': -1}
+    if movie is not None:
+        if movie.availability_status != was:
+            deltas['available_movies'] = int(movie.availability_status == 'Available') - int(was == 'Available')
+            deltas[CATALOG_VERSION] = 1
+        note_search_change(db.session, movie)
+    apply_counter_deltas(db.session, deltas)
+    db.session.refresh(rental)
+    return rental
+
+# Batch checkout and returns
+# A whole stack of items goes through in one transaction: one read of the
+# rows involved, one compare-and-set UPDATE per title sent as a single
+# executemany, the rentals inserted in one flush and one commit. Items that
+# cannot be processed are reported individually while the rest go through.
+# If a concurrent writer wins a race between the read and the UPDATE, the
+# affected row count comes up short; the batch is rolled back and re-run
+# from a fresh read, which then reports the lost items as unavailable.
+BATCH_MAX_ITEMS = 100
+BATCH_ATTEMPTS = 3
+
+class BatchConflict(RentalError):
+    pass
+
+def _batch_item(key, value, error=None, **extra):
+    if error:
+        return {key: value, 'status': 'danger', 'message': error}
+    return dict({key: value, 'status': 'success'}, **extra)
+
+def checkout_movies(movie_ids, customer_id, days=None):
+    """Rent each of movie_ids (repeats mean several copies); caller commits."""
+    wanted = {}
+    for movie_id in movie_ids:
+        wanted[movie_id] = wanted.get(movie_id, 0) + 1
+    movies = {m.movie_id: m for m in Movie.query.filter(Movie.movie_id.in_(wanted)).populate_existing()}
+    left = {mid: m.stock if m.availability_status == 'Available' else 0 for mid, m in movies.items()}
+    plan = []
+    for movie_id in movie_ids:
+        if movie_id not in movies:
+            plan.append((movie_id, 'Movie not found'))
+        elif left[movie_id] <= 0:
+            plan.append((movie_id, 'Movie is not available'))
+        else:
+            left[movie_id] -= 1
+            plan.append((movie_id, None))
+    take = {}
+    for movie_id, error in plan:
+        if error is None:
+            take[movie_id] = take.get(movie_id, 0) + 1
+    if take:
+        movie = Movie.__table__
+        claimed = db.session.execute(
+            movie.update()
+            .where(movie.c.movie_id == db.bindparam('mid'), movie.c.stock >= db.bindparam('take'),
+                   movie.c.availability_status == 'Available')
+            # availability first: MySQL applies SET clauses left to right
+            .ordered_values(
+                (movie.c.availability_status, case((movie.c.stock > db.bindparam('take'), 'Available'), else_='Rented')),
+                (movie.c.stock, movie.c.stock - db.bindparam('take')),
+            ),
+            [{'mid': mid, 'take': n} for mid, n in take.items()],
+        ).rowcount
+        if claimed != len(take):
+            raise BatchConflict('Stock changed while the batch was running')
+        emptied = 0
+        for m in Movie.query.filter(Movie.movie_id.in_(take)).populate_existing():
+            emptied += m.stock == 0
+            note_search_change(db.session, m)
+        if emptied:
+            apply_counter_deltas(db.session, {'available_movies': -emptied, CATALOG_VERSION: 1})
+    today, due = datetime.now().date(), due_date_for(days)
+    rentals = [Rental(movie_id=mid, customer_id=customer_id, rental_date=today, due_date=due,
+                      rental_status='Not Returned')
+               for mid, error in plan if error is None]
+    db.session.add_all(rentals)
+    db.session.flush()
+    made = iter(rentals)
+    return [_batch_item('movie_id', mid, error) if error else _batch_item('movie_id', mid, rental_id=next(made).rental_id)
+            for mid, error in plan]
+
+def return_rentals(rental_ids):
+    """Mark each of rental_ids returned and restock its movie; caller commits."""
+    rental = Rental.__table__
+    rows = {r.rental_id: r for r in db.session.execute(
+        db.select(rental.c.rental_id, rental.c.movie_id, rental.c.rental_status)
+        .where(rental.c.rental_id.in_(set(rental_ids)))
+    )}
+    plan, seen = [], set()
+    for rental_id in rental_ids:
+        if rental_id not in rows:
+            plan.append((rental_id, 'Rental not found'))
+        elif rows[rental_id].rental_status != 'Not Returned' or rental_id in seen:
+            plan.append((rental_id, 'Rental is already returned'))
+        else:
+            seen.add(rental_id)
+            plan.append((rental_id, None))
+    if seen:
+        closed = db.session.execute(
+            rental.update()
+            .where(rental.c.rental_id == db.bindparam('rid'), rental.c.rental_status == 'Not Returned')
+            .values(rental_status='Returned', return_date=datetime.now().date()),
+            [{'rid': rid} for rid in seen],
+        ).rowcount
+        if closed != len(seen):
+            raise BatchConflict('A rental was returned while the batch was running')
+        restock = {}
+        for rid in seen:
+            movie_id = rows[rid].movie_id
+            restock[movie_id] = restock.get(movie_id, 0) + 1
+        movie = Movie.__table__
+        # Locked until commit, like return_rental_copy
+        was = dict(db.session.execute(
+            db.select(movie.c.movie_id, movie.c.availability_status)
+            .where(movie.c.movie_id.in_(restock)).with_for_update()
+        ).all())
+        db.session.execute(
+            movie.update()
+            .where(movie.c.movie_id == db.bindparam('mid'))
+            # Only titles that ran out of copies come back; admin holds stay
+            .ordered_values(
+                (movie.c.availability_status,
+                 case((movie.c.stock == 0, 'Available'), else_=movie.c.availability_status)),
+                (movie.c.stock, movie.c.stock + db.bindparam('n')),
+            ),
+            [{'mid': mid, 'n': n} for mid, n in restock.items()],
+        )
+        deltas = {'active_rentals': -len(seen)}
+        for m in Movie.query.filter(Movie.movie_id.in_(restock)).populate_existing():
+            before = was.get(m.movie_id)
+            if m.availability_status != before:
+                deltas['available_movies'] = (deltas.get('available_movies', 0)
+                                              + int(m.availability_status == 'Available') - int(before == 'Available'))
+                deltas[CATALOG_VERSION] = 1
+            note_search_change(db.session, m)
+        apply_counter_deltas(db.session, deltas)
+    return [_batch_item('rental_id', rid, error) for rid, error in plan]
+
+def commit_batch(fn, *args):
+    """Run a batch service function and commit, re-running it on BatchConflict."""
+    for attempt in range(1, BATCH_ATTEMPTS + 1):
+        try:
+            results = fn(*args)
+            db.session.commit()
+            return results
+        except BatchConflict as e:
+            db.session.rollback()
+            logger.info('Batch %s conflicted (attempt %s): %s', fn.__name__, attempt, e)
+    raise RentalError('Too many concurrent changes, try again')
+
+# Background jobs
+# Long maintenance tasks run on a daemon thread with their own app context;
+# the request that starts one gets a job id back and polls for progress.
+# One job per name runs at a time, and the last few finished jobs are kept.
+_jobs = {}
+_jobs_lock = threading.Lock()
+JOB_HISTORY = 20
+
+def job_snapshot(job):
+    return {k: job[k] for k in ('id', 'name', 'status', 'done', 'total', 'started_at', 'finished_at', 'result', 'error')}
+
+def start_job(name, fn, *args, **kwargs):
+    with _jobs_lock:
+        running = next((j for j in _jobs.values() if j['name'] == name and j['status'] == 'running'), None)
+        if running is not None:
+            return running, False
+        job = {
+            'id': secrets.token_hex(8), 'name': name, 'status': 'running', 'done': 0, 'total': None,
+            'started_at': datetime.utcnow().isoformat(timespec='seconds'), 'finished_at': None,
+            'result': None, 'error': None,
+        }
+        _jobs[job['id']] = job
+        finished = [j for j in _jobs.values() if j['status'] != 'running']
+        for old in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del _jobs[old['id']]
+    threading.Thread(target=_run_job, args=(job, fn, args, kwargs), name=f'job-{name}', daemon=True).start()
+    return job, True
+
+def _run_job(job, fn, args, kwargs):
+    def progress(done, total):
+        job['done'], job['total'] = done, total
+    with app.app_context():
+        try:
+            job['result'] = fn(*args, progress=progress, **kwargs)
+            job['status'] = 'finished'
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('Background job %s (%s) failed', job['name'], job['id'])
+            job['status'], job['error'] = 'failed', str(e)
+        finally:
+            job['finished_at'] = datetime.utcnow().isoformat(timespec='seconds')
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return job_snapshot(job) if job else None
+
+# Popularity
+# movie.rentals_count / last_rented_at are recomputed with one GROUP BY per
+# batch instead of a COUNT(*) per movie. A full pass walks movie_id ranges;
+# an incremental pass folds in only rentals above the stored rental_id
+# watermark. Each batch commits together with its watermark, so an
+# interrupted run resumes where it stopped. Deleted rentals are only
+# reflected by a full pass. SQLite needs 3.33+ for UPDATE ... FROM.
+POPULARITY_CHECKPOINT = 'popularity_rental_id'
+
+def _popularity_sql(mode):
+    rentals = 'SELECT movie_id, COUNT(*) AS n, MAX(rental_date) AS last FROM rental WHERE {} GROUP BY movie_id'
+    if mode == 'full':
+        rentals = rentals.format('movie_id BETWEEN :lo AND :hi AND rental_id <= :top')
+        if db.engine.dialect.name == 'mysql':
+            return [f"""UPDATE movie m LEFT JOIN ({rentals}) r ON r.movie_id = m.movie_id
+                        SET m.rentals_count = COALESCE(r.n, 0), m.last_rented_at = r.last
+                        WHERE m.movie_id BETWEEN :lo AND :hi"""]
+        return [
+            """UPDATE movie SET rentals_count = 0, last_rented_at = NULL
+               WHERE movie_id BETWEEN :lo AND :hi AND (rentals_count <> 0 OR last_rented_at IS NOT NULL)""",
+            f"""UPDATE movie SET rentals_count = r.n, last_rented_at = r.last
+                FROM ({rentals}) AS r WHERE movie.movie_id = r.movie_id""",
+        ]
+    rentals = rentals.format('rental_id BETWEEN :lo AND :hi')
+    newest = 'CASE WHEN {0}last_rented_at IS NULL OR {0}last_rented_at < r.last THEN r.last ELSE {0}last_rented_at END'
+    if db.engine.dialect.name == 'mysql':
+        return [f"""UPDATE movie m JOIN ({rentals}) r ON r.movie_id = m.movie_id
+                    SET m.last_rented_at = {newest.format('m.')}, m.rentals_count = m.rentals_count + r.n"""]
+    return [f"""UPDATE movie SET rentals_count = rentals_count + r.n, last_rented_at = {newest.format('')}
+                FROM ({rentals}) AS r WHERE movie.movie_id = r.movie_id"""]
+
+def _save_popularity_checkpoint(rental_id):
+    db.session.merge(JobCheckpoint(name=POPULARITY_CHECKPOINT, value=rental_id))
+
+def recalc_popularity(full=False, progress=None, batch_size=None):
+    batch_size = batch_size or app.config['POPULARITY_BATCH_SIZE']
+    checkpoint = db.session.get(JobCheckpoint, POPULARITY_CHECKPOINT)
+    top_rental = db.session.execute(db.select(db.func.max(Rental.rental_id))).scalar() or 0
+    mode = 'full' if full or checkpoint is None else 'incremental'
+    if mode == 'full':
+        lo, end = db.session.execute(db.select(db.func.min(Movie.movie_id), db.func.max(Movie.movie_id))).one()
+        lo, end = lo or 0, end or -1
+    else:
+        lo, end = checkpoint.value + 1, top_rental
+    statements = [text(sql) for sql in _popularity_sql(mode)]
+    total = max(0, -(-(end - lo + 1) // batch_size))
+    started = time.perf_counter()
+    updated = 0
+    for batch in range(total):
+        hi = min(lo + batch_size - 1, end)
+        for stmt in statements:
+            updated += db.session.execute(stmt, {'lo': lo, 'hi': hi, 'top': top_rental}).rowcount or 0
+        if mode == 'incremental':
+            _save_popularity_checkpoint(hi)
+        db.session.commit()
+        lo = hi + 1
+        if progress is not None:
+            progress(batch + 1, total)
+    if mode == 'full':
+        # The full pass only counted rentals up to top_rental; newer ones are
+        # picked up by the next incremental run
+        _save_popularity_checkpoint(top_rental)
+        db.session.commit()
+    result = {
+        'mode': mode, 'batches': total, 'rows_updated': updated,
+        'watermark': top_rental if mode == 'full' else max(end, checkpoint.value),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    logger.info('Popularity recalculated: %s', result)
+    return result
+
+@app.cli.command('recalc-popularity')
+@click.option('--full', is_flag=True, help='Recount every movie instead of only rentals since the last run.')
+@click.option('--batch-size', type=int, help='Movie ids (full) or rental ids (incremental) per transaction.')
+def recalc_popularity_command(full, batch_size):
+    """Recompute movie rental counts (incremental by default)."""
+    def progress(done, total):
+        click.echo(f'batch {done}/{total}', err=True)
+    result = recalc_popularity(full=full, progress=progress, batch_size=batch_size)
+    click.echo(f"{result['mode']}: {result['rows_updated']} row update(s) in {result['batches']} batch(es), "
+               f"watermark rental_id={result['watermark']}, {result['seconds']}s")
+
+# Overdue rentals
+# A rental is overdue once its due_date has passed while it is still 'Not
+# Returned'; both the admin listing and the scanner read that as a range on
+# ix_rental_status_due, so returned history never gets scanned. The scanner
+# records one late_fees row per rental that became overdue after the stored
+# checkpoint day, in keyset batches of (due_date, rental_id) that commit one
+# at a time, then moves the checkpoint to yesterday. Rentals that already
+# have a fee are skipped, so an interrupted run can simply be repeated.
+OVERDUE_CHECKPOINT = 'overdue_due_date'
+
+def overdue_query(today, after=None):
+    query = Rental.query.filter(Rental.rental_status == 'Not Returned', Rental.due_date < today)
+    if after is not None:
+        due, rental_id = after
+        query = query.filter(db.or_(Rental.due_date > due, db.and_(Rental.due_date == due, Rental.rental_id > rental_id)))
+    return query.order_by(Rental.due_date, Rental.rental_id)
+
+def parse_overdue_cursor(value):
+    """'YYYY-MM-DD_<rental_id>' -> (date, rental_id), or None."""
+    try:
+        due, rental_id = value.split('_', 1)
+        return date.fromisoformat(due), int(rental_id)
+    except (AttributeError, ValueError):
+        return None
+
+def scan_overdue(progress=None, batch_size=None, today=None):
+    batch_size = batch_size or app.config['OVERDUE_BATCH_SIZE']
+    today = today or datetime.now().date()
+    checkpoint = db.session.get(JobCheckpoint, OVERDUE_CHECKPOINT)
+    since = date.fromordinal(checkpoint.value) if checkpoint and checkpoint.value else None
+
+    def pending(after=None):
+        query = overdue_query(today, after)
+        if since is not None:
+            query = query.filter(Rental.due_date > since)
+        return query
+
+    total = pending().order_by(None).count()
+    started = time.perf_counter()
+    scanned = recorded = 0
+    after = None
+    while True:
+        rows = pending(after).with_entities(Rental.rental_id, Rental.customer_id, Rental.due_date).limit(batch_size).all()
+        if not rows:
+            break
+        fined = set(db.session.execute(
+            db.select(LateFee.rental_id).where(LateFee.rental_id.in_([r.rental_id for r in rows]))
+        ).scalars())
+        fees = [
+            {'rental_id': r.rental_id, 'customer_id': r.customer_id, 'due_date': r.due_date,
+             'amount_cents': app.config['LATE_FEE_CENTS'], 'created_at': datetime.utcnow()}
+            for r in rows if r.rental_id not in fined
+        ]
+        if fees:
+            db.session.execute(LateFee.__table__.insert(), fees)
+        db.session.commit()
+        scanned += len(rows)
+        recorded += len(fees)
+        after = (rows[-1].due_date, rows[-1].rental_id)
+        if progress is not None:
+            progress(scanned, total)
+    through = max(today - timedelta(days=1), since or date.min)
+    db.session.merge(JobCheckpoint(name=OVERDUE_CHECKPOINT, value=through.toordinal()))
+    db.session.commit()
+    if recorded:
+        inc_metric('cinerent_late_fees_total', recorded)
+    result = {
+        'since': since.isoformat() if since else None, 'through': through.isoformat(),
+        'scanned': scanned, 'fees_recorded': recorded, 'seconds': round(time.perf_counter() - started, 3),
+    }
+    logger.info('Overdue scan finished: %s', result)
+    return result
+
+@app.cli.command('scan-overdue')
+@click.option('--batch-size', type=int, help='Rentals per transaction.')
+def scan_overdue_command(batch_size):
+    """Record late fees for rentals that became overdue since the last scan."""
+    result = scan_overdue(batch_size=batch_size)
+    click.echo(f"{result['fees_recorded']} late fee(s) recorded from {result['scanned']} overdue rental(s) "
+               f"due after {result['since'] or 'the beginning'} through {result['through']}, {result['seconds']}s")
+
+# Recommendations ("customers also rented")
+# movie_neighbors is a sparse item-item matrix: for each movie, its
+# RECOMMEND_TOP_K most co-rented titles, scored by the number of distinct
+# customers who rented both. The co-occurrence counts are aggregated in the
+# database with one self-join GROUP BY per batch, never per movie. A full
+# pass walks movie_id ranges; an incremental pass walks rentals above the
+# stored rental_id watermark, recounts the rows of the movies rented in the
+# batch and merges their new counts into each partner's top K. Counts only
+# grow while rentals are appended, so the merge is exact; deleted rentals are
+# only reflected by a full pass. A batch always writes absolute counts, so
+# repeating one (after a crash, or from a second process) is harmless.
+# Committed rentals start a debounced refresh on a background job.
+RECOMMEND_CHECKPOINT = 'recommend_rental_id'
+
+_CO_RENTED_SQL = """SELECT a.movie_id, b.movie_id AS neighbor_id, COUNT(DISTINCT a.customer_id) AS score
+    FROM rental a JOIN rental b ON b.customer_id = a.customer_id AND b.movie_id <> a.movie_id
+    WHERE {} AND a.rental_id <= :top AND b.rental_id <= :top
+    GROUP BY a.movie_id, b.movie_id"""
+
+def top_neighbors(scores, k):
+    """{neighbor_id: score} -> the k best (neighbor_id, score); ties go to the lower id."""
+    return heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+
+def co_rented_counts(where, params, *bindparams):
+    counts = {}
+    stmt = text(_CO_RENTED_SQL.format(where)).bindparams(*bindparams)
+    for movie_id, neighbor_id, score in db.session.execute(stmt, params):
+        counts.setdefault(movie_id, {})[neighbor_id] = score
+    return counts
+
+def write_neighbors(rows, condition):
+    """Replace the movie_neighbors rows matching condition with rows {movie_id: [(neighbor_id, score)]}."""
+    db.session.execute(db.delete(MovieNeighbor).where(condition).execution_options(synchronize_session=False))
+    values = [{'movie_id': m, 'neighbor_id': n, 'score': score} for m, ranked in rows.items() for n, score in ranked]
+    if values:
+        db.session.execute(MovieNeighbor.__table__.insert(), values)
+    return len(values)
+
+def _fold_rentals(lo, hi, top, k):
+    # (movie rented in the batch, another movie its renter has rented)
+    pairs = db.session.execute(text(
+        """SELECT DISTINCT a.movie_id, b.movie_id FROM rental a
+           JOIN rental b ON b.customer_id = a.customer_id AND b.movie_id <> a.movie_id
+           WHERE a.rental_id BETWEEN :lo AND :hi AND b.rental_id <= :top"""),
+        {'lo': lo, 'hi': hi, 'top': top}).all()
+    if not pairs:
+        return 0
+    changed = sorted({m for m, _ in pairs})
+    counts = co_rented_counts('a.movie_id IN :ids', {'ids': changed, 'top': top},
+                              db.bindparam('ids', expanding=True))
+    rows = {m: top_neighbors(counts.get(m, {}), k) for m in changed}
+    partners = {p for _, p in pairs} - set(changed)
+    if partners:
+        stored = {}
+        for movie_id, neighbor_id, score in db.session.execute(
+                db.select(MovieNeighbor.movie_id, MovieNeighbor.neighbor_id, MovieNeighbor.score)
+                .where(MovieNeighbor.movie_id.in_(partners))):
+            stored.setdefault(movie_id, {})[neighbor_id] = score
+        merged = {p: dict(stored.get(p, {})) for p in partners}
+        for m, p in pairs:
+            if p in partners:
+                merged[p][m] = counts[m][p]
+        for p in partners:
+            ranked = top_neighbors(merged[p], k)
+            if ranked != top_neighbors(stored.get(p, {}), k):
+                rows[p] = ranked
+    return write_neighbors(rows, MovieNeighbor.movie_id.in_(list(rows)))
+
+def refresh_recommendations(full=False, progress=None, batch_size=None):
+    batch_size = batch_size or app.config['RECOMMEND_BATCH_SIZE']
+    k = app.config['RECOMMEND_TOP_K']
+    checkpoint = db.session.get(JobCheckpoint, RECOMMEND_CHECKPOINT)
+    top_rental = db.session.execute(db.select(db.func.max(Rental.rental_id))).scalar() or 0
+    mode = 'full' if full or checkpoint is None else 'incremental'
+    if mode == 'full':
+        lo, end = db.session.execute(db.select(db.func.min(Movie.movie_id), db.func.max(Movie.movie_id))).one()
+        lo, end = lo or 0, end or -1
+    else:
+        lo, end = checkpoint.value + 1, top_rental
+    total = max(0, -(-(end - lo + 1) // batch_size))
+    started = time.perf_counter()
+    written = 0
+    for batch in range(total):
+        hi = min(lo + batch_size - 1, end)
+        if mode == 'full':
+            counts = co_rented_counts('a.movie_id BETWEEN :lo AND :hi', {'lo': lo, 'hi': hi, 'top': top_rental})
+            rows = {m: top_neighbors(scores, k) for m, scores in counts.items()}
+            written += write_neighbors(rows, MovieNeighbor.movie_id.between(lo, hi))
+        else:
+            written += _fold_rentals(lo, hi, top_rental, k)
+            db.session.merge(JobCheckpoint(name=RECOMMEND_CHECKPOINT, value=hi))
+        db.session.commit()
+        lo = hi + 1
+        if progress is not None:
+            progress(batch + 1, total)
+    if mode == 'full':
+        # Rentals after top_rental are folded in by the next incremental run
+        db.session.merge(JobCheckpoint(name=RECOMMEND_CHECKPOINT, value=top_rental))
+        db.session.commit()
+    result = {
+        'mode': mode, 'batches': total, 'rows_written': written,
+        'watermark': top_rental if mode == 'full' else max(end, checkpoint.value),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    logger.info('Recommendations refreshed: %s', result)
+    return result
+
+def _debounced_refresh(progress=None):
+    # Rentals committed while this job waits or runs are folded into it
+    # rather than each starting a job of their own
+    time.sleep(app.config['RECOMMEND_REFRESH_DELAY'])
+    result = refresh_recommendations(progress=progress)
+    while (db.session.execute(db.select(db.func.max(Rental.rental_id))).scalar() or 0) > result['watermark']:
+        result = refresh_recommendations(progress=progress)
+    return result
+
+def refresh_recommendations_soon():
+    """Called after rentals are committed; no-op while a refresh is already pending."""
+    if app.config['RECOMMEND_AUTO_REFRESH']:
+        start_job('refresh-recommendations', _debounced_refresh)
+
+def recommendations_query(customer_id, limit=6):
+    # Neighbors of everything the customer has rented, summed per title; the
+    # rented set comes off ix_rental_customer_movie, each row's neighbors off
+    # the movie_neighbors primary key
+    rented = db.select(Rental.movie_id).where(Rental.customer_id == customer_id)
+    seen = rented.distinct().subquery()
+    return (Movie.query
+            .select_from(seen)
+            .join(MovieNeighbor, MovieNeighbor.movie_id == seen.c.movie_id)
+            .join(Movie, Movie.movie_id == MovieNeighbor.neighbor_id)
+            .filter(Movie.movie_id.not_in(rented), Movie.availability_status == 'Available')
+            .group_by(Movie.movie_id)
+            .order_by(db.func.sum(MovieNeighbor.score).desc(), Movie.movie_id)
+            .limit(limit))
+
+def recommend_for_customer(customer_id, limit=6):
+    return recommendations_query(customer_id, limit).all()
+
+@app.cli.command('refresh-recommendations')
+@click.option('--full', is_flag=True, help='Rebuild every movie instead of folding in only rentals since the last run.')
+@click.option('--batch-size', type=int, help='Movie ids (full) or rental ids (incremental) per transaction.')
+def refresh_recommendations_command(full, batch_size):
+    """Update the "customers also rented" table (incremental by default)."""
+    def progress(done, total):
+        click.echo(f'batch {done}/{total}', err=True)
+    result = refresh_recommendations(full=full, progress=progress, batch_size=batch_size)
+    click.echo(f"{result['mode']}: {result['rows_written']} neighbor row(s) written in {result['batches']} batch(es), "
+               f"watermark rental_id={result['watermark']}, {result['seconds']}s")
+
+# Landing stats snapshot cache
+# Snapshots are keyed by `limit` and tagged with the data version they were
+# computed at; write paths bump the version so stale entries are never served.
+_stats_lock = threading.Lock()
+_stats_version = 0
+_stats_cache = {}
+_stats_inflight = {}
+
+def invalidate_landing_stats():
+    global _stats_version
+    with _stats_lock:
+        _stats_version += 1
+    _stream_wake.set()
+
+def compute_landing_stats(limit):
+    counters = get_stats_counters()
+    top = Movie.query.filter_by(availability_status='Available').order_by(Movie.release_year.desc()).limit(limit).all()
+    return {
+        'status': 'success',
+        'server_time': datetime.utcnow().isoformat() + 'Z',
+        'summary': {name: counters.get(name, 0) for name in COUNTER_NAMES},
+        'top_available': [
+            {
+                'movie_id': m.movie_id,
+                'title': sanitize_text(m.title, 100),
+                'genre': sanitize_text(m.genre, 50),
+                'release_year': m.release_year,
+            } for m in top
+        ]
+    }
+
+def _stats_etag(payload):
+    body = {k: v for k, v in payload.items() if k != 'server_time'}
+    digest = hashlib.sha1(json.dumps(body, sort_keys=True).encode('utf-8')).hexdigest()[:20]
+    return f'stats-{digest}'
+
+def get_landing_stats_entry(limit):
+    """Return the cached snapshot dict: payload, etag and last_modified."""
+    ttl = app.config.get('LANDING_STATS_TTL', 5)
+    while True:
+        with _stats_lock:
+            entry = _stats_cache.get(limit)
+            if entry and entry['version'] == _stats_version and entry['expires'] > time.monotonic():
+                return entry
+            pending = _stats_inflight.get(limit)
+            leader = pending is None
+            if leader:
+                # First miss recomputes; concurrent misses wait on its event
+                pending = threading.Event()
+                _stats_inflight[limit] = pending
+                version = _stats_version
+        if not leader:
+            pending.wait(timeout=10)
+            continue
+        try:
+            payload = compute_landing_stats(limit)
+            etag = _stats_etag(payload)
+            # Last-Modified only moves when the content actually changed
+            last_modified = entry['last_modified'] if entry and entry['etag'] == etag else datetime.utcnow().replace(microsecond=0)
+            fresh = {'version': version, 'expires': time.monotonic() + ttl, 'payload': payload,
+                     'etag': etag, 'last_modified': last_modified}
+            with _stats_lock:
+                _stats_cache[limit] = fresh
+            return fresh
+        finally:
+            with _stats_lock:
+                _stats_inflight.pop(limit, None)
+            pending.set()
+
+def get_landing_stats(limit):
+    return get_landing_stats_entry(limit)['payload']
+
+# Live stats stream (Server-Sent Events)
+# One broadcaster thread per process serves every open stream. It polls the
+# stats_counters rows (one small query per STATS_STREAM_POLL, however many
+# clients are connected), so changes committed by other worker processes
+# are seen too, and wakes at once on local writes via
+# invalidate_landing_stats. Only when something changed does it take a
+# snapshot from the shared landing stats cache, and it pushes the snapshot
+# only if its ETag differs from the last one sent. Each client holds just
+# the newest unsent message, so a slow reader skips intermediate snapshots
+# instead of queueing them. Streams send a comment as a heartbeat when idle,
+# close after STATS_STREAM_MAX_AGE (EventSource reconnects by itself), and
+# beyond STATS_STREAM_MAX_CLIENTS new ones get a 503 and the page polls.
+_stream_lock = threading.Lock()
+_stream_wake = threading.Event()
+_stream_subscribers = set()
+_stream_thread = None
+
+class StatsSubscriber:
+    __slots__ = ('limit', 'etag', 'ready', 'message')
+
+    def __init__(self, limit, etag=None):
+        self.limit = limit
+        self.etag = etag
+        self.ready = threading.Event()
+        self.message = None
+
+def stats_event(entry):
+    return f"id: {entry['etag']}\nevent: stats\ndata: {json.dumps(entry['payload'])}\n\n"
+
+def publish_stats(limit, entry):
+    message = stats_event(entry)
+    delivered = 0
+    with _stream_lock:
+        for sub in _stream_subscribers:
+            if sub.limit == limit and sub.etag != entry['etag']:
+                sub.etag = entry['etag']
+                sub.message = message  # replaces a snapshot the client has not read yet
+                sub.ready.set()
+                delivered += 1
+    if delivered:
+        inc_metric('cinerent_stats_stream_events_total', delivered)
+
+def _stats_broadcast_loop():
+    global _stream_thread
+    counters, sent = None, {}
+    with app.app_context():
+        while True:
+            woken = _stream_wake.is_set()
+            _stream_wake.clear()
+            with _stream_lock:
+                if not _stream_subscribers:
+                    _stream_thread = None
+                    return
+                limits = {sub.limit for sub in _stream_subscribers}
+            try:
+                current = tuple(sorted(db.session.execute(db.select(StatsCounter.name, StatsCounter.value)).all()))
+                db.session.rollback()  # end the read so the next poll sees new commits
+                if counters is not None and current != counters and not woken:
+                    invalidate_landing_stats()  # committed by another process
+                    _stream_wake.clear()
+                changed = woken or current != counters
+                counters = current
+                for limit in limits:
+                    if changed or limit not in sent:
+                        entry = get_landing_stats_entry(limit)
+                        if sent.get(limit) != entry['etag']:
+                            sent[limit] = entry['etag']
+                            publish_stats(limit, entry)
+            except Exception:
+                logger.exception('Stats broadcast failed')
+            finally:
+                db.session.remove()
+            _stream_wake.wait(timeout=app.config['STATS_STREAM_POLL'])
+
+def subscribe_stats(limit, etag=None):
+    """Register a stream client, starting the broadcaster; None when full."""
+    global _stream_thread
+    with _stream_lock:
+        if len(_stream_subscribers) >= app.config['STATS_STREAM_MAX_CLIENTS']:
+            return None
+        sub = StatsSubscriber(limit, etag)
+        _stream_subscribers.add(sub)
+        if _stream_thread is None:
+            _stream_thread = threading.Thread(target=_stats_broadcast_loop, name='stats-broadcast', daemon=True)
+            _stream_thread.start()
+    return sub
+
+def unsubscribe_stats(sub):
+    with _stream_lock:
+        _stream_subscribers.discard(sub)
+
+def stream_stats(sub, first=None):
+    heartbeat = app.config['STATS_STREAM_HEARTBEAT']
+    deadline = time.monotonic() + app.config['STATS_STREAM_MAX_AGE']
+    try:
+        yield 'retry: 3000\n\n'
+        if first:
+            yield first
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not sub.ready.wait(timeout=min(heartbeat, remaining)):
+                yield ': heartbeat\n\n'
+                continue
+            with _stream_lock:
+                message, sub.message = sub.message, None
+                sub.ready.clear()
+            if message:
+                yield message
+    finally:
+        # Also runs when the client disconnects and the server closes the generator
+        unsubscribe_stats(sub)
+
+# Rendered page cache and response compression
+# Pages whose output depends only on a few low-cardinality inputs (never the
+# session) are rendered once per distinct context and kept as bytes, along
+# with their gzip/brotli encodings, which are computed on first request and
+# then reused. Other responses are compressed on the fly when the client
+# accepts it and the body is large enough to be worth it; brotli is used
+# when the optional package is installed. Responses that embed the session's
+# CSRF token are never compressed: next to reflected input (filters, search
+# terms, flash text) the compressed size would leak the token (BREACH).
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+_page_cache = OrderedDict()
+_page_cache_lock = threading.Lock()
+
+def negotiate_encoding():
+    if not app.config['RESPONSE_COMPRESSION']:
+        return None
+    accept = request.accept_encodings
+    gzip_q = accept.quality('gzip')
+    if brotli is not None and accept.quality('br') > 0 and accept.quality('br') >= gzip_q:
+        return 'br'
+    return 'gzip' if gzip_q > 0 else None
+
+def compress_body(data, encoding, cached=False):
+    # Cached bodies are compressed once, so they get the slow, tight settings
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if cached else 4, mode=brotli.MODE_TEXT)
+    return gzip.compress(data, compresslevel=9 if cached else 6, mtime=0)
+
+def template_mtime(name):
+    return os.path.getmtime(os.path.join(app.root_path, app.template_folder, name))
+
+def get_cached_page(template, **context):
+    key = (template, tuple(sorted(context.items())))
+    with _page_cache_lock:
+        entry = _page_cache.get(key)
+        if entry is not None:
+            _page_cache.move_to_end(key)
+            inc_metric('cinerent_page_cache_total', result='hit')
+            return entry
+    inc_metric('cinerent_page_cache_total', result='miss')
+    body = render_template(template, **context).encode('utf-8')
+    entry = {
+        'body': body,
+        'etag': hashlib.sha1(body).hexdigest(),
+        'last_modified': datetime.utcfromtimestamp(int(template_mtime(template))),
+        'encoded': {},
+        'cached': False,
+    }
+    # Template edits only show up in debug/auto-reload mode, so only cache otherwise
+    if app.config['PAGE_CACHE_MAX'] > 0 and not (app.debug or app.config.get('TEMPLATES_AUTO_RELOAD')):
+        entry['cached'] = True
+        with _page_cache_lock:
+            entry = _page_cache.setdefault(key, entry)
+            while len(_page_cache) > app.config['PAGE_CACHE_MAX']:
+                _page_cache.popitem(last=False)
+    return entry
+
+def cached_page_response(template, max_age=300, **context):
+    entry = get_cached_page(template, **context)
+    encoding = negotiate_encoding()
+    body, etag = entry['body'], entry['etag']
+    if encoding:
+        encoded = entry['encoded'].get(encoding)
+        if encoded is None:
+            encoded = entry['encoded'][encoding] = compress_body(body, encoding, cached=entry['cached'])
+        body, etag = encoded, f'{etag}-{encoding}'
+    resp = app.make_response(body)
+    resp.mimetype = 'text/html'
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.vary.add('Accept-Encoding')
+    resp.set_etag(etag)
+    resp.last_modified = entry['last_modified']
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    return resp.make_conditional(request)
+
+@app.after_request
+def compress_response(resp):
+    if (resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed
+            or 'Content-Encoding' in resp.headers or g.get('csrf_in_body')
+            or not (resp.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return resp
+    data = resp.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return resp
+    resp.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if not encoding:
+        return resp
+    etag, weak = resp.get_etag()
+    if etag:
+        # Each encoding is its own representation; revalidation against the
+        # encoded tag is answered here, since the view only knew the plain one
+        resp.set_etag(f'{etag}-{encoding}', weak)
+        if request.if_none_match.contains_weak(f'{etag}-{encoding}'):
+            return resp.make_conditional(request)
+    resp.set_data(compress_body(data, encoding))
+    resp.headers['Content-Encoding'] = encoding
+    return resp
+
+# Catalog fragment cache
+# The customer movie grid is the same for every customer, so it is rendered
+# once per catalog version and shared; the greeting around it is rendered per
+# request. The version lives in stats_counters and is bumped in the same
+# transaction as any change customers can see, so every worker process
+# notices it on its next page view.
+_fragment_lock = threading.Lock()
+_fragment_cache = {}
+_fragment_inflight = {}
+
+def get_catalog_version():
+    return db.session.execute(
+        db.select(StatsCounter.value).where(StatsCounter.name == CATALOG_VERSION)
+    ).scalar() or 0
+
+def cached_fragment(name, version, render):
+    """Return render() as Markup, rendered at most once per (name, version)."""
+    while True:
+        with _fragment_lock:
+            cached = _fragment_cache.get(name)
+            if cached and cached[0] == version:
+                inc_metric('cinerent_fragment_cache_total', result='hit')
+                return cached[1]
+            pending = _fragment_inflight.get((name, version))
+            leader = pending is None
+            if leader:
+                # Concurrent misses for the same version wait for one render
+                pending = _fragment_inflight[(name, version)] = threading.Event()
+        if not leader:
+            pending.wait(timeout=10)
+            continue
+        try:
+            inc_metric('cinerent_fragment_cache_total', result='miss')
+            html = Markup(render())
+            with _fragment_lock:
+                current = _fragment_cache.get(name)
+                if current is None or current[0] <= version:
+                    _fragment_cache[name] = (version, html)
+            return html
+        finally:
+            with _fragment_lock:
+                _fragment_inflight.pop((name, version), None)
+            pending.set()
+
 # Routes
 @app.route('/')
 def index():
@@ -245,7 +2700,21 @@ def admin_login():
             password = request.form['password']
         admin = Admin.query.filter_by(username=username).first()
         logger.info('Admin login attempt: %s', username)
-        if admin and check_password_hash(admin.password, password):
+        try:
+            ok, upgraded = verify_password(admin.password, password) if admin else (False, None)
+        except PasswordHasherBusy:
+            inc_metric('cinerent_logins_total', kind='admin', result='busy')
+            return hasher_busy_response('admin_login.html')
+        inc_metric('cinerent_logins_total', kind='admin', result='success' if ok else 'failure')
+        if ok and upgraded:
+            admin.password = upgraded
+            try:
+                db.session.commit()
+                logger.info('Upgraded password hash for admin %s', admin.admin_id)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Failed to upgrade password hash for admin %s', admin.admin_id)
+        if ok:
             session['admin_id'] = admin.admin_id
             session['is_admin'] = True
             if request.is_json:
@@ -260,27 +2729,55 @@ def admin_login():
     return render_template('admin_login.html')
 
 @app.route('/admin/dashboard')
+@replica_reads
 def admin_dashboard():
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
     
-    total_movies = Movie.query.count()
-    total_customers = Customer.query.count()
-    active_rentals = Rental.query.filter_by(rental_status='Not Returned').count()
-    available_movies = Movie.query.filter_by(availability_status='Available').count()
-    
+    counters = get_stats_counters()
     return render_template('admin_dashboard.html', 
-                         total_movies=total_movies,
-                         total_customers=total_customers,
-                         active_rentals=active_rentals,
-                         available_movies=available_movies)
+                         total_movies=counters.get('total_movies', 0),
+                         total_customers=counters.get('total_customers', 0),
+                         active_rentals=counters.get('active_rentals', 0),
+                         available_movies=counters.get('available_movies', 0))
 
 @app.route('/admin/movies')
+@replica_reads
 def admin_movies():
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
-    movies = Movie.query.all()
-    return render_template('admin_movies.html', movies=movies)
+    after, limit, descending = page_args()
+    filters = {
+        'status': sanitize_text(request.args.get('status', ''), 20),
+        'genre': sanitize_text(request.args.get('genre', ''), 50),
+        'year': validate_year(request.args.get('year')),
+    }
+    query = Movie.query
+    if filters['status']:
+        query = query.filter(Movie.availability_status == filters['status'])
+    if filters['genre']:
+        query = query.filter(Movie.genre == filters['genre'])
+    if filters['year']:
+        query = query.filter(Movie.release_year == filters['year'])
+    movies, next_cursor = keyset_page(query, Movie.movie_id, after, limit, descending)
+    if wants_json():
+        return {
+            'status': 'success',
+            'items': [
+                {
+                    'movie_id': m.movie_id,
+                    'title': m.title,
+                    'genre': m.genre,
+                    'release_year': m.release_year,
+                    'availability_status': m.availability_status,
+                    'stock': m.stock,
+                } for m in movies
+            ],
+            'next_cursor': next_cursor,
+            'limit': limit,
+        }
+    return render_template('admin_movies.html', movies=movies, filters=filters,
+                           next_url=next_page_url(next_cursor), limit=limit)
 
 @app.route('/admin/movies/add', methods=['GET', 'POST'])
 def add_movie():
@@ -293,12 +2790,15 @@ def add_movie():
             title = sanitize_text(data.get('title',''), 100)
             genre = sanitize_text(data.get('genre',''), 50)
             year = validate_year(data.get('release_year'))
+            stock = to_int_in_range(data.get('stock', 1), default=1, min_v=0, max_v=10000)
             if not (title and genre and year):
                 return { 'status': 'danger', 'message': 'Invalid input' }, 400
-            movie = Movie(title=title, genre=genre, release_year=year, availability_status='Available')
+            movie = Movie(title=title, genre=genre, release_year=year, stock=stock,
+                          availability_status='Available' if stock > 0 else 'Rented')
             try:
                 db.session.add(movie)
                 db.session.commit()
+                invalidate_landing_stats()
                 logger.info('Movie added: %s (%s)', movie.title, movie.release_year)
             except Exception as e:
                 db.session.rollback()
@@ -309,13 +2809,16 @@ def add_movie():
             title = sanitize_text(request.form['title'], 100)
             genre = sanitize_text(request.form['genre'], 50)
             year = validate_year(request.form['release_year'])
+            stock = to_int_in_range(request.form.get('stock', 1), default=1, min_v=0, max_v=10000)
             if not (title and genre and year):
                 flash('Invalid input', 'danger')
                 return render_template('add_movie.html')
-            movie = Movie(title=title, genre=genre, release_year=year, availability_status='Available')
+            movie = Movie(title=title, genre=genre, release_year=year, stock=stock,
+                          availability_status='Available' if stock > 0 else 'Rented')
             try:
                 db.session.add(movie)
                 db.session.commit()
+                invalidate_landing_stats()
                 logger.info('Movie added: %s (%s)', movie.title, movie.release_year)
                 flash('Movie added successfully!', 'success')
                 return redirect(url_for('admin_movies'))
@@ -343,8 +2846,13 @@ def edit_movie(id):
                     return { 'status': 'danger', 'message': 'Invalid year' }, 400
                 movie.release_year = yr
             if 'availability_status' in data: movie.availability_status = sanitize_text(data['availability_status'], 20)
+            if 'stock' in data:
+                movie.stock = to_int_in_range(data['stock'], default=movie.stock, min_v=0, max_v=10000)
+                if movie.stock == 0:
+                    movie.availability_status = 'Rented'
             try:
                 db.session.commit()
+                invalidate_landing_stats()
                 logger.info('Movie autosaved: id=%s', movie.movie_id)
             except Exception:
                 db.session.rollback()
@@ -363,8 +2871,13 @@ def edit_movie(id):
             movie.genre = genre
             movie.release_year = year
             movie.availability_status = status
+            if request.form.get('stock') is not None:
+                movie.stock = to_int_in_range(request.form['stock'], default=movie.stock, min_v=0, max_v=10000)
+                if movie.stock == 0:
+                    movie.availability_status = 'Rented'
             try:
                 db.session.commit()
+                invalidate_landing_stats()
                 logger.info('Movie updated: id=%s', movie.movie_id)
                 flash('Movie updated successfully!', 'success')
                 return redirect(url_for('admin_movies'))
@@ -384,6 +2897,7 @@ def delete_movie(id):
     try:
         db.session.delete(movie)
         db.session.commit()
+        invalidate_landing_stats()
         logger.info('Movie deleted: id=%s', id)
         flash('Movie deleted successfully!', 'success')
     except Exception:
@@ -393,11 +2907,29 @@ def delete_movie(id):
     return redirect(url_for('admin_movies'))
 
 @app.route('/admin/customers')
+@replica_reads
 def admin_customers():
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
-    customers = Customer.query.all()
-    return render_template('admin_customers.html', customers=customers)
+    after, limit, descending = page_args()
+    customers, next_cursor = keyset_page(Customer.query, Customer.customer_id, after, limit, descending)
+    if wants_json():
+        return {
+            'status': 'success',
+            'items': [
+                {
+                    'customer_id': c.customer_id,
+                    'name': c.name,
+                    'email': c.email,
+                    'phone': c.phone,
+                    'address': c.address,
+                } for c in customers
+            ],
+            'next_cursor': next_cursor,
+            'limit': limit,
+        }
+    return render_template('admin_customers.html', customers=customers,
+                           next_url=next_page_url(next_cursor), limit=limit)
 
 @app.route('/admin/customers/add', methods=['GET', 'POST'])
 def admin_add_customer():
@@ -422,10 +2954,15 @@ def admin_add_customer():
                 return { 'status': 'danger', 'message': 'Invalid input' }, 400
             flash('Invalid input', 'danger')
             return redirect(url_for('admin_add_customer'))
-        customer = Customer(name=name, email=email, phone=phone, address=address, password=generate_password_hash(pwd))
+        try:
+            hashed = hash_password(pwd)
+        except PasswordHasherBusy:
+            return hasher_busy_response('admin_customer_add.html')
+        customer = Customer(name=name, email=email, phone=phone, address=address, password=hashed)
         try:
             db.session.add(customer)
             db.session.commit()
+            invalidate_landing_stats()
             logger.info('Admin added customer: %s', email)
         except Exception:
             db.session.rollback()
@@ -481,6 +3018,7 @@ def admin_delete_customer(id):
     try:
         db.session.delete(customer)
         db.session.commit()
+        invalidate_landing_stats()
         logger.info('Admin deleted customer: %s', id)
         flash('Customer deleted', 'success')
     except Exception:
@@ -490,11 +3028,94 @@ def admin_delete_customer(id):
     return redirect(url_for('admin_customers'))
 
 @app.route('/admin/rentals')
+@replica_reads
 def admin_rentals():
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
-    rentals = Rental.query.all()
-    return render_template('admin_rentals.html', rentals=rentals)
+    after, limit, descending = page_args()
+    filters = {
+        'status': sanitize_text(request.args.get('status', ''), 20),
+        'customer_id': request.args.get('customer_id', type=int),
+        'movie_id': request.args.get('movie_id', type=int),
+    }
+    # Join in only the columns the listing shows instead of lazy-loading per row
+    query = Rental.query.options(
+        joinedload(Rental.movie).load_only(Movie.title),
+        joinedload(Rental.customer).load_only(Customer.name),
+    )
+    if filters['status']:
+        query = query.filter(Rental.rental_status == filters['status'])
+    if filters['customer_id']:
+        query = query.filter(Rental.customer_id == filters['customer_id'])
+    if filters['movie_id']:
+        query = query.filter(Rental.movie_id == filters['movie_id'])
+    rentals, next_cursor = keyset_page(query, Rental.rental_id, after, limit, descending)
+    if wants_json():
+        return {
+            'status': 'success',
+            'items': [
+                {
+                    'rental_id': r.rental_id,
+                    'movie_id': r.movie_id,
+                    'movie_title': r.movie.title if r.movie else None,
+                    'customer_id': r.customer_id,
+                    'customer_name': r.customer.name if r.customer else None,
+                    'rental_date': r.rental_date.isoformat() if r.rental_date else None,
+                    'return_date': r.return_date.isoformat() if r.return_date else None,
+                    'rental_status': r.rental_status,
+                } for r in rentals
+            ],
+            'next_cursor': next_cursor,
+            'limit': limit,
+        }
+    return render_template('admin_rentals.html', rentals=rentals, filters=filters,
+                           next_url=next_page_url(next_cursor), limit=limit)
+
+@app.route('/admin/rentals/overdue')
+@replica_reads
+def admin_overdue_rentals():
+    if 'admin_id' not in session:
+        return redirect(url_for('admin_login'))
+    limit = to_int_in_range(request.args.get('limit', ADMIN_PAGE_SIZE), default=ADMIN_PAGE_SIZE, min_v=1, max_v=ADMIN_PAGE_SIZE_MAX)
+    after = parse_overdue_cursor(request.args.get('after'))
+    if request.args.get('after') and after is None:
+        return { 'status': 'danger', 'message': 'Invalid cursor' }, 400
+    today = datetime.now().date()
+    # Most overdue first; the cursor is the (due_date, rental_id) of the last row
+    query = overdue_query(today, after).options(
+        joinedload(Rental.movie).load_only(Movie.title),
+        joinedload(Rental.customer).load_only(Customer.name),
+    )
+    customer_id = request.args.get('customer_id', type=int)
+    if customer_id:
+        query = query.filter(Rental.customer_id == customer_id)
+    rentals = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rentals) > limit:
+        rentals = rentals[:limit]
+        next_cursor = f'{rentals[-1].due_date.isoformat()}_{rentals[-1].rental_id}'
+    fined = set(db.session.execute(
+        db.select(LateFee.rental_id).where(LateFee.rental_id.in_([r.rental_id for r in rentals]))
+    ).scalars()) if rentals else set()
+    return {
+        'status': 'success',
+        'as_of': today.isoformat(),
+        'items': [
+            {
+                'rental_id': r.rental_id,
+                'movie_id': r.movie_id,
+                'movie_title': r.movie.title if r.movie else None,
+                'customer_id': r.customer_id,
+                'customer_name': r.customer.name if r.customer else None,
+                'rental_date': r.rental_date.isoformat() if r.rental_date else None,
+                'due_date': r.due_date.isoformat(),
+                'days_overdue': (today - r.due_date).days,
+                'late_fee_recorded': r.rental_id in fined,
+            } for r in rentals
+        ],
+        'next_cursor': next_cursor,
+        'limit': limit,
+    }
 
 @app.route('/admin/rentals/add', methods=['GET', 'POST'])
 def add_rental():
@@ -506,20 +3127,28 @@ def add_rental():
             data = request.get_json() or {}
             movie_id = data.get('movie_id')
             customer_id = data.get('customer_id')
-            days = int(data.get('days', 3))
+            days = data.get('days')
         else:
             movie_id = request.form['movie_id']
             customer_id = request.form['customer_id']
-            days = int(request.form.get('days', '3'))
+            days = request.form.get('days')
+        days = to_int_in_range(days, default=app.config['RENTAL_DAYS'], min_v=1, max_v=RENTAL_DAYS_MAX)
 
         try:
-            db.session.execute(text('CALL sp_create_rental(:customer_id, :movie_id, :days)'), {
-                'customer_id': customer_id,
-                'movie_id': movie_id,
-                'days': days
-            })
+            checkout_movie(int(movie_id), int(customer_id), days)
             db.session.commit()
-            logger.info('Rental recorded via procedure: movie=%s customer=%s days=%s', movie_id, customer_id, days)
+            invalidate_landing_stats()
+            refresh_recommendations_soon()
+            inc_metric('cinerent_rentals_total', result='success')
+            logger.info('Rental recorded: movie=%s customer=%s days=%s', movie_id, customer_id, days)
+        except RentalError as e:
+            db.session.rollback()
+            inc_metric('cinerent_rentals_total', result='not_found' if isinstance(e, RentalNotFound) else 'unavailable')
+            logger.info('Rental refused movie=%s customer=%s: %s', movie_id, customer_id, e)
+            if request.is_json:
+                return { 'status': 'danger', 'message': str(e) }, 404 if isinstance(e, RentalNotFound) else 409
+            flash(str(e), 'danger')
+            return redirect(url_for('add_rental'))
         except Exception:
             db.session.rollback()
             logger.exception('Failed to record rental movie=%s customer=%s', movie_id, customer_id)
@@ -543,23 +3172,129 @@ def return_rental(id):
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
     
-    rental = Rental.query.get_or_404(id)
-    rental.return_date = datetime.now().date()
-    rental.rental_status = 'Returned'
-    
-    movie = Movie.query.get(rental.movie_id)
-    movie.availability_status = 'Available'
-    
     try:
+        return_rental_copy(id)
         db.session.commit()
+        invalidate_landing_stats()
+        inc_metric('cinerent_returns_total')
         logger.info('Rental returned: id=%s', id)
         flash('Movie returned successfully!', 'success')
+    except RentalNotFound:
+        db.session.rollback()
+        abort(404)
+    except RentalError as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
     except Exception:
         db.session.rollback()
         logger.exception('Failed to mark rental returned %s', id)
         flash('Failed to mark as returned', 'danger')
     return redirect(url_for('admin_rentals'))
 
+def parse_id_list(values):
+    """Positive integer ids from a JSON list or form values (comma-separated allowed)."""
+    if values is None:
+        return []
+    ids = []
+    for value in values if isinstance(values, list) else [values]:
+        for part in str(value).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if not part.isdigit() or int(part) < 1:
+                return None
+            ids.append(int(part))
+    return ids
+
+def batch_reply(results, key, done_text, failed_text):
+    ok = sum(1 for r in results if r['status'] == 'success')
+    message = f'{ok} of {len(results)} {done_text}'
+    status = 'success' if ok == len(results) else ('warning' if ok else 'danger')
+    if request.is_json:
+        return { 'status': status, 'message': message, 'results': results }
+    flash(message, status)
+    failed = [f"#{r[key]} ({r['message']})" for r in results if r['status'] != 'success']
+    if failed:
+        flash(f"{failed_text}: {', '.join(failed)}", 'danger')
+    return redirect(url_for('admin_rentals'))
+
+def batch_error(message, code):
+    if request.is_json:
+        return { 'status': 'danger', 'message': message }, code
+    flash(message, 'danger')
+    return redirect(url_for('admin_rentals'))
+
+@app.route('/admin/rentals/batch', methods=['POST'])
+def add_rentals_batch():
+    if 'admin_id' not in session:
+        return redirect(url_for('admin_login'))
+    if request.is_json:
+        data = request.get_json() or {}
+        movie_ids = parse_id_list(data.get('movie_ids'))
+        customer_id = data.get('customer_id')
+        days = data.get('days')
+    else:
+        movie_ids = parse_id_list(request.form.getlist('movie_ids'))
+        customer_id = request.form.get('customer_id')
+        days = request.form.get('days')
+    days = to_int_in_range(days, default=app.config['RENTAL_DAYS'], min_v=1, max_v=RENTAL_DAYS_MAX)
+    try:
+        customer_id = int(customer_id)
+    except (TypeError, ValueError):
+        return batch_error('customer_id is required', 400)
+    if not movie_ids or len(movie_ids) > BATCH_MAX_ITEMS:
+        return batch_error(f'movie_ids must list 1 to {BATCH_MAX_ITEMS} movie ids', 400)
+    if db.session.get(Customer, customer_id) is None:
+        return batch_error('Customer not found', 404)
+
+    try:
+        results = commit_batch(checkout_movies, movie_ids, customer_id, days)
+    except RentalError as e:
+        logger.info('Batch rental refused customer=%s: %s', customer_id, e)
+        return batch_error(str(e), 409)
+    except Exception:
+        db.session.rollback()
+        logger.exception('Failed to record batch rental customer=%s movies=%s', customer_id, movie_ids)
+        return batch_error('Failed to record rentals', 500)
+    for r in results:
+        if r['status'] == 'success':
+            inc_metric('cinerent_rentals_total', result='success')
+        else:
+            inc_metric('cinerent_rentals_total', result='not_found' if r['message'] == 'Movie not found' else 'unavailable')
+    if any(r['status'] == 'success' for r in results):
+        invalidate_landing_stats()
+        refresh_recommendations_soon()
+    logger.info('Batch rental recorded: customer=%s items=%s rented=%s', customer_id, len(results),
+                sum(1 for r in results if r['status'] == 'success'))
+    return batch_reply(results, 'movie_id', 'rentals recorded', 'Not rented')
+
+@app.route('/admin/rentals/return-batch', methods=['POST'])
+def return_rentals_batch():
+    if 'admin_id' not in session:
+        return redirect(url_for('admin_login'))
+    if request.is_json:
+        rental_ids = parse_id_list((request.get_json() or {}).get('rental_ids'))
+    else:
+        rental_ids = parse_id_list(request.form.getlist('rental_ids'))
+    if not rental_ids or len(rental_ids) > BATCH_MAX_ITEMS:
+        return batch_error(f'rental_ids must list 1 to {BATCH_MAX_ITEMS} rental ids', 400)
+
+    try:
+        results = commit_batch(return_rentals, rental_ids)
+    except RentalError as e:
+        logger.info('Batch return refused: %s', e)
+        return batch_error(str(e), 409)
+    except Exception:
+        db.session.rollback()
+        logger.exception('Failed to return rentals %s', rental_ids)
+        return batch_error('Failed to mark as returned', 500)
+    returned = sum(1 for r in results if r['status'] == 'success')
+    if returned:
+        inc_metric('cinerent_returns_total', returned)
+        invalidate_landing_stats()
+    logger.info('Batch return: items=%s returned=%s', len(results), returned)
+    return batch_reply(results, 'rental_id', 'rentals returned', 'Not returned')
+
 @app.route('/admin/logout')
 def admin_logout():
     session.pop('admin_id', None)
@@ -578,15 +3313,83 @@ def admin_tools():
 def admin_recalc_popularity():
     if 'admin_id' not in session:
         return redirect(url_for('admin_login'))
+    data = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    full = str(data.get('mode', '')).lower() == 'full'
+    job, started = start_job('recalc-popularity', recalc_popularity, full=full)
+    message = 'Popularity recalculation started' if started else 'Popularity recalculation already running'
+    logger.info('%s: job=%s full=%s', message, job['id'], full)
+    status_url = url_for('admin_job_status', job_id=job['id'])
+    return { 'status': 'success', 'message': message, 'job': job_snapshot(job), 'status_url': status_url }, 202, {'Location': status_url}
+
+@app.route('/admin/tools/scan-overdue', methods=['POST'])
+def admin_scan_overdue():
+    if 'admin_id' not in session:
+        return redirect(url_for('admin_login'))
+    job, started = start_job('scan-overdue', scan_overdue)
+    message = 'Overdue scan started' if started else 'Overdue scan already running'
+    logger.info('%s: job=%s', message, job['id'])
+    status_url = url_for('admin_job_status', job_id=job['id'])
+    return { 'status': 'success', 'message': message, 'job': job_snapshot(job), 'status_url': status_url }, 202, {'Location': status_url}
+
+@app.route('/admin/tools/refresh-recommendations', methods=['POST'])
+def admin_refresh_recommendations():
+    if 'admin_id' not in session:
+        return redirect(url_for('admin_login'))
+    data = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    full = str(data.get('mode', '')).lower() == 'full'
+    job, started = start_job('refresh-recommendations', refresh_recommendations, full=full)
+    message = 'Recommendation refresh started' if started else 'Recommendation refresh already running'
+    logger.info('%s: job=%s full=%s', message, job['id'], full)
+    status_url = url_for('admin_job_status', job_id=job['id'])
+    return { 'status': 'success', 'message': message, 'job': job_snapshot(job), 'status_url': status_url }, 202, {'Location': status_url}
+
+@app.route('/admin/tools/jobs/<job_id>')
+def admin_job_status(job_id):
+    if 'admin_id' not in session:
+        return redirect(url_for('admin_login'))
+    job = get_job(job_id)
+    if job is None:
+        return { 'status': 'danger', 'message': 'Unknown job' }, 404
+    return job
+
+@app.route('/admin/import/<kind>', methods=['POST'])
+def admin_bulk_import(kind):
+    if 'admin_id' not in session:
+        return redirect(url_for('admin_login'))
+    if kind not in IMPORT_KINDS:
+        return { 'status': 'danger', 'message': 'Unknown import type' }, 404
+    upload = request.files.get('file')
+    if upload:
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8')
+        filename = upload.filename
+    else:
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8')
+        filename = None
     try:
-        db.session.execute(text('CALL sp_recalc_popularity()'))
-        db.session.commit()
-        logger.info('Recalculated popularity via cursor procedure')
-        return { 'status': 'success', 'message': 'Popularity recalculated' }
+        report = bulk_import(kind, stream, import_format(filename, request.args.get('format')))
     except Exception:
         db.session.rollback()
-        logger.exception('Failed to recalc popularity')
-        return { 'status': 'danger', 'message': 'Failed to recalc popularity' }, 500
+        logger.exception('Bulk import of %s failed', kind)
+        return { 'status': 'danger', 'message': 'Import failed' }, 500
+    return { 'status': 'success', 'message': f"Imported {report['inserted']} {kind}", 'report': report }
+
+@app.route('/admin/export/<kind>')
+def admin_export(kind):
+    # Admin session, or the read token for scheduled (nightly) exports
+    if 'admin_id' not in session and not (app.config.get('READ_API_TOKEN') and require_read_token()):
+        return redirect(url_for('admin_login'))
+    if kind not in EXPORT_COLUMNS:
+        return { 'status': 'danger', 'message': 'Unknown export type' }, 404
+    fmt = 'ndjson' if request.args.get('format') == 'ndjson' else 'csv'
+    since_id = request.args.get('since_id', type=int)
+    since_date = parse_since_date(request.args.get('since_date'))
+    logger.info('Export started: %s format=%s since_id=%s since_date=%s', kind, fmt, since_id, since_date)
+    filename = f"{kind}-{datetime.utcnow():%Y%m%d%H%M%S}.{fmt}"
+    return Response(
+        stream_with_context(iter_export(kind, fmt, since_id, since_date)),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
 
 # Customer Routes
 @app.route('/customer/register', methods=['GET', 'POST'])
@@ -601,10 +3404,15 @@ def customer_register():
             pwd = data.get('password','')
             if not (name and email and phone and address and pwd):
                 return { 'status': 'danger', 'message': 'Invalid input' }, 400
-            customer = Customer(name=name, email=email, phone=phone, address=address, password=generate_password_hash(pwd))
+            try:
+                hashed = hash_password(pwd)
+            except PasswordHasherBusy:
+                return hasher_busy_response('customer_register.html')
+            customer = Customer(name=name, email=email, phone=phone, address=address, password=hashed)
             try:
                 db.session.add(customer)
                 db.session.commit()
+                invalidate_landing_stats()
                 logger.info('Customer registered: %s', email)
             except Exception:
                 db.session.rollback()
@@ -620,10 +3428,15 @@ def customer_register():
             if not (name and email and phone and address and pwd):
                 flash('Invalid input', 'danger')
                 return render_template('customer_register.html')
-            customer = Customer(name=name, email=email, phone=phone, address=address, password=generate_password_hash(pwd))
+            try:
+                hashed = hash_password(pwd)
+            except PasswordHasherBusy:
+                return hasher_busy_response('customer_register.html')
+            customer = Customer(name=name, email=email, phone=phone, address=address, password=hashed)
             try:
                 db.session.add(customer)
                 db.session.commit()
+                invalidate_landing_stats()
                 logger.info('Customer registered: %s', email)
                 flash('Registration successful! Please login.', 'success')
                 return redirect(url_for('customer_login'))
@@ -645,8 +3458,21 @@ def customer_login():
             email = request.form['email']
             password = request.form['password']
         customer = Customer.query.filter_by(email=email).first()
-        
-        if customer and check_password_hash(customer.password, password):
+        try:
+            ok, upgraded = verify_password(customer.password, password) if customer else (False, None)
+        except PasswordHasherBusy:
+            inc_metric('cinerent_logins_total', kind='customer', result='busy')
+            return hasher_busy_response('customer_login.html')
+        inc_metric('cinerent_logins_total', kind='customer', result='success' if ok else 'failure')
+        if ok and upgraded:
+            customer.password = upgraded
+            try:
+                db.session.commit()
+                logger.info('Upgraded password hash for customer %s', customer.customer_id)
+            except Exception:
+                db.session.rollback()
+                logger.exception('Failed to upgrade password hash for customer %s', customer.customer_id)
+        if ok:
             session['customer_id'] = customer.customer_id
             if request.is_json:
                 return { 'status': 'success', 'message': 'Login successful', 'redirect': url_for('customer_dashboard') }
@@ -660,20 +3486,27 @@ def customer_login():
     return render_template('customer_login.html')
 
 @app.route('/customer/dashboard')
+@replica_reads
 def customer_dashboard():
     if 'customer_id' not in session:
         return redirect(url_for('customer_login'))
     
     customer = Customer.query.get(session['customer_id'])
-    available_movies = Movie.query.filter_by(availability_status='Available').all()
-    return render_template('customer_dashboard.html', customer=customer, movies=available_movies)
+    movie_grid = cached_fragment('customer_movie_grid', get_catalog_version(), lambda: render_template(
+        'customer_movie_grid.html', movies=Movie.query.filter_by(availability_status='Available').all()))
+    recommended = recommend_for_customer(session['customer_id'])
+    return render_template('customer_dashboard.html', customer=customer, movie_grid=movie_grid, recommended=recommended)
 
 @app.route('/customer/rentals')
+@replica_reads
 def customer_rentals():
     if 'customer_id' not in session:
         return redirect(url_for('customer_login'))
     
-    rentals = Rental.query.filter_by(customer_id=session['customer_id']).all()
+    rentals = (Rental.query
+               .options(joinedload(Rental.movie).load_only(Movie.title))
+               .filter_by(customer_id=session['customer_id'])
+               .all())
     return render_template('customer_rentals.html', rentals=rentals)
 
 @app.route('/customer/rent/<int:movie_id>')
@@ -681,26 +3514,26 @@ def rent_movie(movie_id):
     if 'customer_id' not in session:
         return redirect(url_for('customer_login'))
     
-    movie = Movie.query.get_or_404(movie_id)
-    if movie.availability_status == 'Available':
-        rental = Rental(
-            movie_id=movie_id,
-            customer_id=session['customer_id'],
-            rental_date=datetime.now().date(),
-            rental_status='Not Returned'
-        )
-        movie.availability_status = 'Rented'
-        try:
-            db.session.add(rental)
-            db.session.commit()
-            logger.info('Customer rented movie: movie=%s customer=%s', movie_id, session['customer_id'])
-            flash('Movie rented successfully!', 'success')
-        except Exception:
-            db.session.rollback()
-            logger.exception('Failed to rent movie=%s by customer=%s', movie_id, session['customer_id'])
-            flash('Failed to rent movie', 'danger')
-    else:
+    try:
+        checkout_movie(movie_id, session['customer_id'])
+        db.session.commit()
+        invalidate_landing_stats()
+        refresh_recommendations_soon()
+        inc_metric('cinerent_rentals_total', result='success')
+        logger.info('Customer rented movie: movie=%s customer=%s', movie_id, session['customer_id'])
+        flash('Movie rented successfully!', 'success')
+    except RentalNotFound:
+        db.session.rollback()
+        inc_metric('cinerent_rentals_total', result='not_found')
+        abort(404)
+    except RentalUnavailable:
+        db.session.rollback()
+        inc_metric('cinerent_rentals_total', result='unavailable')
         flash('Movie is not available!', 'danger')
+    except Exception:
+        db.session.rollback()
+        logger.exception('Failed to rent movie=%s by customer=%s', movie_id, session['customer_id'])
+        flash('Failed to rent movie', 'danger')
     return redirect(url_for('customer_dashboard'))
 
 @app.route('/customer/logout')
@@ -711,41 +3544,82 @@ def customer_logout():
 
 @app.route('/landing')
 def landing_page():
-    return render_template('landing.html', api_token=app.config.get('READ_API_TOKEN', ''))
+    # The only input is the configured token, so one render serves everyone
+    return cached_page_response('landing.html', api_token=app.config.get('READ_API_TOKEN', ''))
 
 @app.route('/api/landing_stats')
+@replica_reads
 def api_landing_stats():
     if not require_read_token():
         return { 'status': 'danger', 'message': 'Unauthorized' }, 401
     limit = to_int_in_range(request.args.get('limit', 8), default=8, min_v=1, max_v=50)
     try:
-        total_movies = Movie.query.count()
-        available_movies = Movie.query.filter_by(availability_status='Available').count()
-        total_customers = Customer.query.count()
-        active_rentals = Rental.query.filter_by(rental_status='Not Returned').count()
-        top = Movie.query.filter_by(availability_status='Available').order_by(Movie.release_year.desc()).limit(limit).all()
-        payload = {
-            'status': 'success',
-            'server_time': datetime.utcnow().isoformat() + 'Z',
-            'summary': {
-                'total_movies': total_movies,
-                'available_movies': available_movies,
-                'total_customers': total_customers,
-                'active_rentals': active_rentals,
-            },
-            'top_available': [
-                {
-                    'movie_id': m.movie_id,
-                    'title': sanitize_text(m.title, 100),
-                    'genre': sanitize_text(m.genre, 50),
-                    'release_year': m.release_year,
-                } for m in top
-            ]
-        }
-        return payload
+        entry = get_landing_stats_entry(limit)
     except Exception:
         logger.exception('Failed to compute landing stats')
         return { 'status': 'danger', 'message': 'Failed to load stats' }, 500
+    # Repeat polls revalidate against the cached snapshot's ETag, so within the
+    # TTL they are answered with a 304 that never reaches the database
+    resp = app.make_response(entry['payload'])
+    resp.set_etag(entry['etag'])
+    resp.last_modified = entry['last_modified']
+    if app.config.get('READ_API_TOKEN'):
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True
+    else:
+        resp.cache_control.public = True
+        resp.cache_control.max_age = int(app.config.get('LANDING_STATS_TTL', 5))
+    return resp.make_conditional(request)
+
+@app.route('/api/landing_stats/stream')
+def api_landing_stats_stream():
+    if not require_read_token(allow_query=True):
+        return { 'status': 'danger', 'message': 'Unauthorized' }, 401
+    if not app.config.get('STATS_STREAM'):
+        return { 'status': 'danger', 'message': 'Live stats are disabled' }, 404
+    limit = to_int_in_range(request.args.get('limit', 8), default=8, min_v=1, max_v=50)
+    try:
+        entry = get_landing_stats_entry(limit)
+    except Exception:
+        logger.exception('Failed to compute landing stats')
+        return { 'status': 'danger', 'message': 'Failed to load stats' }, 500
+    sub = subscribe_stats(limit, entry['etag'])
+    if sub is None:
+        return { 'status': 'danger', 'message': 'Too many live clients' }, 503, {'Retry-After': '30'}
+    # A reconnecting client that already has this snapshot is not sent it again
+    first = None if request.headers.get('Last-Event-ID') == entry['etag'] else stats_event(entry)
+    resp = Response(stream_stats(sub, first), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+@app.route('/metrics')
+def metrics():
+    if not require_read_token():
+        return { 'status': 'danger', 'message': 'Unauthorized' }, 401
+    return Response(render_metrics(collect_metrics()), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/movies/search')
+def api_movie_search():
+    if 'customer_id' not in session and 'admin_id' not in session and not require_read_token():
+        return { 'status': 'danger', 'message': 'Unauthorized' }, 401
+    q = sanitize_text(request.args.get('q', ''), 100)
+    limit = to_int_in_range(request.args.get('limit', 20), default=20, min_v=1, max_v=50)
+    offset = to_int_in_range(request.args.get('offset', 0), default=0, min_v=0, max_v=SEARCH_SCAN_LIMIT)
+    available_only = request.args.get('available', '1') != '0'
+    try:
+        results, has_more = get_catalog_index().search(q, limit=limit, offset=offset, available_only=available_only)
+    except Exception:
+        logger.exception('Catalog search failed for %r', q)
+        return { 'status': 'danger', 'message': 'Search failed' }, 500
+    return {
+        'status': 'success',
+        'query': q,
+        'results': results,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if has_more else None,
+    }
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
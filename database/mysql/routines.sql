@@ -1,4 +1,4 @@
--- MySQL routines: transactions, functions, and cursor-based procedure
+-- MySQL routines: transactions, functions, and set-based recalculation
 USE cinerent;
 
 DELIMITER $$
@@ -59,28 +59,18 @@ BEGIN
   COMMIT;
 END$$
 
--- Procedure: recalculate rentals_count for all movies using a cursor
+-- Procedure: recalculate rentals_count for all movies with one set-based
+-- GROUP BY join (movies without rentals reset to 0)
 CREATE PROCEDURE sp_recalc_popularity()
 BEGIN
-  DECLARE done INT DEFAULT 0;
-  DECLARE v_movie_id INT;
-  DECLARE cur CURSOR FOR SELECT id FROM movies;
-  DECLARE CONTINUE HANDLER FOR NOT FOUND SET done = 1;
-
-  OPEN cur;
-  read_loop: LOOP
-    FETCH cur INTO v_movie_id;
-    IF done = 1 THEN
-      LEAVE read_loop;
-    END IF;
-
-    UPDATE movies m
-      SET m.rentals_count = (
-        SELECT COUNT(*) FROM rentals r WHERE r.movie_id = v_movie_id
-      )
-    WHERE m.id = v_movie_id;
-  END LOOP;
-  CLOSE cur;
+  UPDATE movies m
+    LEFT JOIN (
+      SELECT movie_id, COUNT(*) AS n, MAX(rented_at) AS last_rented
+        FROM rentals
+       GROUP BY movie_id
+    ) r ON r.movie_id = m.id
+     SET m.rentals_count = COALESCE(r.n, 0),
+         m.last_rented_at = r.last_rented;
 END$$
 
 DELIMITER ;
\ No newline at end of file
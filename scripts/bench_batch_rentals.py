@@ -0,0 +1,149 @@
+"""Compare batch rental/return endpoints with the one-item-per-request loop.
+
+Each round rents --items movies to one customer and then returns them,
+either through /admin/rentals/add and /admin/rentals/return/<id> (one
+request, transaction and commit per item, like the counter does today) or
+through /admin/rentals/batch and /admin/rentals/return-batch. Requests go
+through the Flask test client against a throwaway SQLite database, or any
+SQLAlchemy URL passed with --database-url; statements and commits are
+counted with engine events. Afterwards a title an admin has put on hold
+(marked 'Rented' with copies left) is rented and returned in a batch, to
+check that the hold survives and the stats counters do not drift.
+
+    python scripts/bench_batch_rentals.py --items 50 --rounds 10 --output batch_bench.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_DIR = os.getcwd()
+WORK_DIR = tempfile.mkdtemp(prefix='cinerent-batch-')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=50, help='movies per stack (at most 100)')
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--output', help='write JSON results to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(WORK_DIR, 'batch.db')
+    sys.path.insert(0, ROOT)
+    os.chdir(WORK_DIR)  # keep app.log out of the checkout
+
+    import logging
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from app import app, db, bootstrap_database, reconcile_stats_counters, Movie, Customer
+    app.config['RECOMMEND_AUTO_REFRESH'] = False
+
+    logging.getLogger('movie_rental').setLevel(logging.WARNING)
+    app.config['SERVER_TIMING'] = False
+    with app.app_context():
+        bootstrap_database()
+        movies = [Movie(title=f'Batch Bench {i}', genre='Drama', release_year=2000, stock=args.rounds * 2)
+                  for i in range(args.items)]
+        customer = Customer(name='Batch Bench', email=f'batch-bench-{time.time_ns()}@example.com',
+                            phone='0', address='-', password='-')
+        db.session.add_all(movies + [customer])
+        db.session.commit()
+        movie_ids = [m.movie_id for m in movies]
+        customer_id = customer.customer_id
+        dialect = db.engine.dialect.name
+
+    counts = {'statements': 0, 'commits': 0}
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _count_statement(*_):
+        counts['statements'] += 1
+
+    @event.listens_for(Engine, 'commit')
+    def _count_commit(*_):
+        counts['commits'] += 1
+
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s['admin_id'] = 1
+        s['is_admin'] = True
+        s['csrf_token'] = 'bench'
+    headers = {'X-CSRF-Token': 'bench'}
+
+    def per_item():
+        for movie_id in movie_ids:
+            resp = client.post('/admin/rentals/add', json={'movie_id': movie_id, 'customer_id': customer_id}, headers=headers)
+            assert resp.status_code == 200, resp.get_data(as_text=True)
+        with app.app_context():
+            rental_ids = [r for (r,) in db.session.execute(db.text(
+                'SELECT rental_id FROM rental WHERE customer_id = :c AND rental_status = :s'),
+                {'c': customer_id, 's': 'Not Returned'})]
+        for rental_id in rental_ids:
+            resp = client.get(f'/admin/rentals/return/{rental_id}')
+            assert resp.status_code == 302, resp.status_code
+        return 2 * len(movie_ids)
+
+    def batch():
+        resp = client.post('/admin/rentals/batch', json={'customer_id': customer_id, 'movie_ids': movie_ids}, headers=headers)
+        results = resp.get_json()['results']
+        assert all(r['status'] == 'success' for r in results), results
+        resp = client.post('/admin/rentals/return-batch', json={'rental_ids': [r['rental_id'] for r in results]}, headers=headers)
+        assert resp.get_json()['status'] == 'success', resp.get_json()
+        return 2
+
+    results = {'items': args.items, 'rounds': args.rounds, 'database': dialect, 'modes': {}}
+    for name, fn in (('per-item', per_item), ('batch', batch)):
+        fn()  # warm up
+        counts.update(statements=0, commits=0)
+        requests = 0
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            requests += fn()
+        elapsed = time.perf_counter() - started
+        items = args.rounds * args.items * 2
+        results['modes'][name] = {
+            'requests': requests,
+            'seconds': round(elapsed, 3),
+            'ms_per_item': round(elapsed / items * 1000, 3),
+            'statements_per_item': round(counts['statements'] / items, 2),
+            'commits': counts['commits'],
+        }
+    results['speedup'] = round(results['modes']['per-item']['seconds'] / results['modes']['batch']['seconds'], 2)
+    with app.app_context():
+        results['counter_drift'] = reconcile_stats_counters(fix=False)
+
+    held_id = movie_ids[0]
+    resp = client.post('/admin/rentals/batch', json={'customer_id': customer_id, 'movie_ids': [held_id]}, headers=headers)
+    rental_id = resp.get_json()['results'][0]['rental_id']
+    resp = client.post(f'/admin/movies/edit/{held_id}', json={'availability_status': 'Rented'}, headers=headers)
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    resp = client.post('/admin/rentals/return-batch', json={'rental_ids': [rental_id]}, headers=headers)
+    assert resp.get_json()['status'] == 'success', resp.get_json()
+    with app.app_context():
+        held = db.session.get(Movie, held_id)
+        results['held_title'] = {
+            'status_after_return': held.availability_status,
+            'stock': held.stock,
+            'counter_drift': reconcile_stats_counters(fix=False),
+        }
+
+    text_out = json.dumps(results, indent=2)
+    print(text_out)
+    if args.output:
+        with open(os.path.join(START_DIR, args.output), 'w', encoding='utf-8') as f:
+            f.write(text_out + '\n')
+    held = results['held_title']
+    if results['counter_drift'] or held['counter_drift'] or held['status_after_return'] != 'Rented':
+        print('FAIL: stats counters drifted or a held title was released', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Benchmark the cold-start cost of importing app.py.
+
+Each run is a fresh interpreter (as on a serverless cold start) that times
+``import app`` against a throwaway SQLite database. The framework imports are
+timed separately so the app's own share is visible.
+
+    python scripts/bench_import.py --runs 15 --output import_bench.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPETS = {
+    'framework': 'import flask, flask_sqlalchemy, sqlalchemy, werkzeug.security',
+    'app': 'import app',
+}
+
+TIMER = (
+    'import sys, time; sys.path.insert(0, {root!r}); '
+    't = time.perf_counter(); {snippet}; '
+    'print(time.perf_counter() - t)'
+)
+
+
+def time_import(snippet, work_dir):
+    env = dict(os.environ)
+    env['DATABASE_URL'] = 'sqlite:///' + os.path.join(work_dir, 'bench.db')
+    out = subprocess.run(
+        [sys.executable, '-c', TIMER.format(root=ROOT, snippet=snippet)],
+        cwd=work_dir, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1]) * 1000.0
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'min_ms': round(ordered[0], 2),
+        'median_ms': round(statistics.median(ordered), 2),
+        'max_ms': round(ordered[-1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--max-ms', type=float, help='fail if the median app import exceeds this')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='cinerent-import-')
+    results = {}
+    for name, snippet in SNIPPETS.items():
+        results[name] = summarize([time_import(snippet, work_dir) for _ in range(args.runs)])
+    results['app_only_median_ms'] = round(results['app']['median_ms'] - results['framework']['median_ms'], 2)
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    if args.max_ms is not None and results['app']['median_ms'] > args.max_ms:
+        print(f"app import median {results['app']['median_ms']}ms exceeds budget {args.max_ms}ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
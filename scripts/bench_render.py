@@ -0,0 +1,84 @@
+"""Measure CPU per request for /landing with and without the page cache.
+
+Each scenario toggles the page cache and response compression on the app
+and issues the same GET through the Flask test client, recording process
+CPU time (not wall time) per request and the bytes sent. "before" is the
+old behaviour: render on every request, send uncompressed.
+
+    python scripts/bench_render.py --requests 500 --output render_bench.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_DIR = os.getcwd()
+WORK_DIR = tempfile.mkdtemp(prefix='cinerent-render-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORK_DIR, 'render.db')
+sys.path.insert(0, ROOT)
+os.chdir(WORK_DIR)  # keep app.log out of the checkout
+
+import logging  # noqa: E402
+import app as cinerent  # noqa: E402
+
+# name, page cache entries, compression, Accept-Encoding
+SCENARIOS = [
+    ('before: render every request, identity', 0, False, 'gzip, br'),
+    ('render every request + compress', 0, True, 'gzip, br'),
+    ('after: cached, identity', 32, True, 'identity'),
+    ('after: cached, gzip', 32, True, 'gzip'),
+    ('after: cached, br', 32, True, 'br'),
+]
+
+
+def run(client, requests, accept):
+    headers = {'Accept-Encoding': accept}
+    client.get('/landing', headers=headers)  # warm up (first render / compression)
+    size = 0
+    cpu, wall = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        resp = client.get('/landing', headers=headers)
+        size = len(resp.get_data())
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    return {
+        'cpu_us_per_request': round(cpu / requests * 1e6, 1),
+        'wall_us_per_request': round(wall / requests * 1e6, 1),
+        'bytes': size,
+        'encoding': resp.headers.get('Content-Encoding', 'identity'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+
+    app = cinerent.app
+    logging.getLogger('movie_rental').setLevel(logging.WARNING)
+    with app.app_context():
+        cinerent.bootstrap_database()
+    client = app.test_client()
+    results = {'requests': args.requests, 'brotli': cinerent.brotli is not None, 'scenarios': {}}
+    for name, cache_size, compress, accept in SCENARIOS:
+        app.config['PAGE_CACHE_MAX'] = cache_size
+        app.config['RESPONSE_COMPRESSION'] = compress
+        cinerent._page_cache.clear()
+        results['scenarios'][name] = run(client, args.requests, accept)
+    base = results['scenarios'][SCENARIOS[0][0]]['cpu_us_per_request']
+    for row in results['scenarios'].values():
+        row['cpu_vs_before'] = round(row['cpu_us_per_request'] / base, 3)
+
+    text_out = json.dumps(results, indent=2)
+    print(text_out)
+    if args.output:
+        with open(os.path.join(START_DIR, args.output), 'w', encoding='utf-8') as f:
+            f.write(text_out + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""Hammer one hot title from many threads and check for double-booking.
+
+Runs the compare-and-set checkout service (and, for comparison, the old
+read-then-write ORM path) against a throwaway SQLite database, or any
+SQLAlchemy URL passed with --database-url. With --procedure-url pointing at
+a MySQL database that has database/mysql/*.sql installed, the
+sp_create_rental stored-procedure path is measured too.
+
+    python scripts/bench_rental_checkout.py --threads 16 --copies 200 --output checkout_bench.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_DIR = os.getcwd()
+WORK_DIR = tempfile.mkdtemp(prefix='cinerent-checkout-')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--copies', type=int, default=200, help='stock of the hot title')
+    parser.add_argument('--attempts', type=int, default=40, help='checkout attempts per thread')
+    parser.add_argument('--database-url', help='defaults to a temporary SQLite file')
+    parser.add_argument('--procedure-url', help='MySQL URL of the cinerent schema with routines installed')
+    parser.add_argument('--output', help='write JSON results to this file')
+    return parser.parse_args()
+
+
+def run_threads(threads, attempts, attempt_fn):
+    counts = {'ok': 0, 'unavailable': 0, 'error': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+
+    def worker(worker_id):
+        local = {'ok': 0, 'unavailable': 0, 'error': 0}
+        barrier.wait()
+        for _ in range(attempts):
+            local[attempt_fn(worker_id)] += 1
+        with lock:
+            for k, v in local.items():
+                counts[k] += v
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    total = threads * attempts
+    counts.update({
+        'attempts': total,
+        'seconds': round(elapsed, 3),
+        'attempts_per_sec': round(total / elapsed, 1),
+        'checkouts_per_sec': round(counts['ok'] / elapsed, 1),
+    })
+    return counts
+
+
+def bench_orm(strategy, args):
+    from app import app, db, bootstrap_database, checkout_movie, RentalUnavailable, Movie, Customer, Rental
+
+    with app.app_context():
+        bootstrap_database()
+        movie = Movie(title=f'Hot Title ({strategy})', genre='Drama', release_year=2024, stock=args.copies)
+        customers = [Customer(name=f'Bench {strategy} {i}', email=f'bench-{strategy}-{i}@example.com',
+                              phone='0', address='-', password='-') for i in range(args.threads)]
+        db.session.add(movie)
+        db.session.add_all(customers)
+        db.session.commit()
+        movie_id = movie.movie_id
+        customer_ids = [c.customer_id for c in customers]
+
+    def cas(worker_id):
+        with app.app_context():
+            try:
+                checkout_movie(movie_id, customer_ids[worker_id])
+                db.session.commit()
+                return 'ok'
+            except RentalUnavailable:
+                db.session.rollback()
+                return 'unavailable'
+            except Exception:
+                db.session.rollback()
+                return 'error'
+
+    def read_then_write(worker_id):
+        # What rent_movie did before: read availability, then write it back
+        with app.app_context():
+            try:
+                m = db.session.get(Movie, movie_id)
+                if m.stock <= 0:
+                    db.session.rollback()
+                    return 'unavailable'
+                m.stock = m.stock - 1
+                db.session.add(Rental(movie_id=movie_id, customer_id=customer_ids[worker_id]))
+                db.session.commit()
+                return 'ok'
+            except Exception:
+                db.session.rollback()
+                return 'error'
+
+    result = run_threads(args.threads, args.attempts, cas if strategy == 'cas' else read_then_write)
+    with app.app_context():
+        final_stock = db.session.get(Movie, movie_id).stock
+        rentals = Rental.query.filter_by(movie_id=movie_id).count()
+    result.update({
+        'copies': args.copies,
+        'final_stock': final_stock,
+        'rentals': rentals,
+        'double_booked': rentals > args.copies or rentals != args.copies - final_stock or final_stock < 0,
+    })
+    return result
+
+
+def bench_procedure(args):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(args.procedure_url, pool_size=args.threads, max_overflow=0)
+    with engine.begin() as conn:
+        movie_id = conn.execute(text("INSERT INTO movies(title, stock, price) VALUES ('Hot Title (procedure)', :n, 0)"),
+                                {'n': args.copies}).lastrowid
+        customer_ids = []
+        for i in range(args.threads):
+            customer_ids.append(conn.execute(
+                text('INSERT INTO customers(name, email) VALUES (:n, :e)'),
+                {'n': f'Bench procedure {i}', 'e': f'bench-proc-{movie_id}-{i}@example.com'},
+            ).lastrowid)
+
+    def call(worker_id):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text('CALL sp_create_rental(:c, :m, 3)'), {'c': customer_ids[worker_id], 'm': movie_id})
+            return 'ok'
+        except Exception as e:
+            return 'unavailable' if 'No stock available' in str(e) else 'error'
+
+    result = run_threads(args.threads, args.attempts, call)
+    with engine.connect() as conn:
+        final_stock = conn.execute(text('SELECT stock FROM movies WHERE id = :m'), {'m': movie_id}).scalar()
+        rentals = conn.execute(text('SELECT COUNT(*) FROM rentals WHERE movie_id = :m'), {'m': movie_id}).scalar()
+    result.update({
+        'copies': args.copies,
+        'final_stock': final_stock,
+        'rentals': rentals,
+        'double_booked': rentals > args.copies or rentals != args.copies - final_stock,
+    })
+    return result
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(WORK_DIR, 'checkout.db')
+    sys.path.insert(0, ROOT)
+    os.chdir(WORK_DIR)  # keep app.log out of the checkout
+
+    results = {
+        'threads': args.threads,
+        'attempts_per_thread': args.attempts,
+        'database': os.environ['DATABASE_URL'].split(':', 1)[0],
+        'strategies': {
+            'cas': bench_orm('cas', args),
+            'read_then_write': bench_orm('read_then_write', args),
+        },
+    }
+    if args.procedure_url:
+        results['strategies']['procedure'] = bench_procedure(args)
+
+    text_out = json.dumps(results, indent=2)
+    print(text_out)
+    if args.output:
+        with open(os.path.join(START_DIR, args.output), 'w', encoding='utf-8') as f:
+            f.write(text_out + '\n')
+    return 1 if results['strategies']['cas']['double_booked'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
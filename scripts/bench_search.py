@@ -0,0 +1,118 @@
+"""Benchmark catalog search lookups on a synthetic catalog.
+
+Builds a CatalogSearchIndex directly (no database) from generated titles and
+times a mix of exact, prefix, multi-word and misspelled queries.
+
+    python scripts/bench_search.py --size 1000000 --output search_bench.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix='cinerent-search-')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(WORK_DIR, 'unused.db'))
+sys.path.insert(0, ROOT)
+START_DIR = os.getcwd()
+os.chdir(WORK_DIR)  # keep app.log out of the checkout
+
+from app import CatalogSearchIndex  # noqa: E402
+
+GENRES = ['Action', 'Comedy', 'Drama', 'Horror', 'Sci-Fi', 'Romance', 'Thriller', 'Animation']
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ten', 'vor', 'shi', 'dan', 'el', 'qu', 'nor', 'bri', 'sta', 'mon', 'fe', 'zu']
+
+
+def make_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_queries(rng, vocab, titles, count):
+    queries = []
+    for i in range(count):
+        word = rng.choice(vocab)
+        kind = i % 4
+        if kind == 0:
+            queries.append(('exact', word))
+        elif kind == 1:
+            queries.append(('prefix', word[:max(2, len(word) - 2)]))
+        elif kind == 2:
+            # What a user types while finishing a title they have in mind
+            first, second = rng.choice(titles).split()[:2]
+            queries.append(('multi', f'{first} {second[:3]}'))
+        else:
+            pos = rng.randrange(len(word))
+            typo = word[:pos] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[pos + 1:]
+            queries.append(('typo', typo))
+    return queries
+
+
+def percentile(sorted_values, pct):
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1_000_000, help='number of synthetic titles')
+    parser.add_argument('--vocab', type=int, default=50_000, help='distinct title words')
+    parser.add_argument('--queries', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write JSON results to this file')
+    args = parser.parse_args()
+    output = os.path.join(START_DIR, args.output) if args.output else None
+
+    rng = random.Random(args.seed)
+    vocab = make_vocabulary(rng, args.vocab)
+    index = CatalogSearchIndex()
+    multi_word_titles = []
+    started = time.perf_counter()
+    for movie_id in range(1, args.size + 1):
+        title = ' '.join(rng.choice(vocab) for _ in range(rng.randint(1, 4)))
+        if movie_id % 97 == 0 and ' ' in title:
+            multi_word_titles.append(title)
+        index.add(movie_id, title.title(), rng.choice(GENRES), rng.randint(1950, 2025),
+                  'Available' if rng.random() < 0.8 else 'Rented')
+    build_s = time.perf_counter() - started
+
+    timings = {}
+    for kind, query in make_queries(rng, vocab, multi_word_titles, args.queries):
+        t = time.perf_counter()
+        index.search(query, limit=20)
+        timings.setdefault(kind, []).append((time.perf_counter() - t) * 1e6)
+
+    results = {'size': args.size, 'vocab': args.vocab, 'build_seconds': round(build_s, 2), 'lookups_us': {}}
+    all_us = []
+    for kind, values in sorted(timings.items()):
+        values.sort()
+        all_us.extend(values)
+        results['lookups_us'][kind] = {
+            'n': len(values),
+            'p50': round(percentile(values, 50), 1),
+            'p95': round(percentile(values, 95), 1),
+            'p99': round(percentile(values, 99), 1),
+        }
+    all_us.sort()
+    results['lookups_us']['all'] = {
+        'n': len(all_us),
+        'p50': round(percentile(all_us, 50), 1),
+        'p95': round(percentile(all_us, 95), 1),
+        'p99': round(percentile(all_us, 99), 1),
+    }
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,73 +1,256 @@
+"""Build the static site described by scripts/static_pages.json.
+
+Pages are rendered in parallel, minified and written with precompressed
+.gz (and .br, when the brotli package is installed) siblings. A page is
+skipped when the hash of its template, the templates it extends or includes,
+its context and the build settings matches the previous build, as recorded
+in <output_dir>/.build-manifest.json. Hand-written files listed under
+"assets" are only compressed. Netlify's _redirects is generated from the
+page routes.
+
+    python scripts/build_static.py
+    python scripts/build_static.py --force --jobs 4 --output-dir /tmp/site
+"""
+import argparse
+import gzip
+import hashlib
+import json
 import os
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-OUTPUT_DIR = "static_site"
+from jinja2 import Environment, FileSystemLoader, meta, select_autoescape
 
-def main():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    env = Environment(
-        loader=FileSystemLoader("templates"),
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES_DIR = os.path.join(ROOT, "templates")
+MANIFEST = os.path.join(ROOT, "scripts", "static_pages.json")
+BUILD_MANIFEST = ".build-manifest.json"
+# Bump when minify/compress output changes, to invalidate every cached page
+BUILDER_VERSION = 1
+
+PROTECTED_RE = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.IGNORECASE | re.DOTALL)
+COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+SPACE_RE = re.compile(r"\s+")
+
+
+def make_env():
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
         autoescape=select_autoescape(["html", "xml"]),
     )
 
-    # Render landing page as site index for GitHub Pages
-    template = env.get_template("landing.html")
-    html = template.render(api_token="")
-    with open(os.path.join(OUTPUT_DIR, "index.html"), "w", encoding="utf-8") as f:
-        f.write(html)
-    print(f"Wrote {OUTPUT_DIR}/index.html")
-
-    # Render login page to directory-style path: /login/
-    login_out_dir = os.path.join(OUTPUT_DIR, "login")
-    os.makedirs(login_out_dir, exist_ok=True)
-    login_tpl = env.get_template("login.html")
-    login_html = login_tpl.render()
-    with open(os.path.join(login_out_dir, "index.html"), "w", encoding="utf-8") as f:
-        f.write(login_html)
-    print(f"Wrote {login_out_dir}/index.html")
-
-    # Render register page to: /register/
-    register_out_dir = os.path.join(OUTPUT_DIR, "register")
-    os.makedirs(register_out_dir, exist_ok=True)
-    register_tpl = env.get_template("register.html")
-    register_html = register_tpl.render()
-    with open(os.path.join(register_out_dir, "index.html"), "w", encoding="utf-8") as f:
-        f.write(register_html)
-    print(f"Wrote {register_out_dir}/index.html")
-
-    # Render dashboard page to: /dashboard/
-    dashboard_out_dir = os.path.join(OUTPUT_DIR, "dashboard")
-    os.makedirs(dashboard_out_dir, exist_ok=True)
-    dashboard_tpl = env.get_template("dashboard.html")
-    dashboard_html = dashboard_tpl.render()
-    with open(os.path.join(dashboard_out_dir, "index.html"), "w", encoding="utf-8") as f:
-        f.write(dashboard_html)
-    print(f"Wrote {dashboard_out_dir}/index.html")
-
-    # Render platform page to: /platform/
-    platform_out_dir = os.path.join(OUTPUT_DIR, "platform")
-    os.makedirs(platform_out_dir, exist_ok=True)
-    platform_tpl = env.get_template("platform.html")
-    platform_html = platform_tpl.render()
-    with open(os.path.join(platform_out_dir, "index.html"), "w", encoding="utf-8") as f:
-        f.write(platform_html)
-    print(f"Wrote {platform_out_dir}/index.html")
 
+def minify_html(html):
+    # Whitespace runs collapse to one space (which renders the same) except
+    # inside <pre>/<textarea>; <script>/<style> only lose indentation and
+    # blank lines, so line-sensitive JS (comments, ASI) keeps working
+    parts = []
+    pos = 0
+    for match in PROTECTED_RE.finditer(html):
+        parts.append(SPACE_RE.sub(" ", COMMENT_RE.sub("", html[pos:match.start()])))
+        block = match.group(1)
+        if match.group(2).lower() in ("script", "style"):
+            block = "\n".join(line.strip() for line in block.splitlines() if line.strip())
+        parts.append(block)
+        pos = match.end()
+    parts.append(SPACE_RE.sub(" ", COMMENT_RE.sub("", html[pos:])))
+    return "".join(parts).strip() + "\n"
+
+
+def template_dependencies(env, name, seen=None):
+    seen = set() if seen is None else seen
+    if name in seen:
+        return seen
+    seen.add(name)
+    source = env.loader.get_source(env, name)[0]
+    for ref in meta.find_referenced_templates(env.parse(source)):
+        if ref:
+            template_dependencies(env, ref, seen)
+    return seen
+
+
+def page_hash(env, page, minify):
+    digest = hashlib.sha256()
+    digest.update(json.dumps({
+        "builder": BUILDER_VERSION,
+        "minify": minify,
+        "brotli": brotli is not None,
+        "context": page.get("context", {}),
+    }, sort_keys=True).encode())
+    for name in sorted(template_dependencies(env, page["template"])):
+        digest.update(name.encode() + b"\0")
+        digest.update(env.loader.get_source(env, name)[0].encode() + b"\0")
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read() + f"builder={BUILDER_VERSION}".encode()).hexdigest()
+
+
+def compressed_paths(path):
+    return [path + ".gz"] + ([path + ".br"] if brotli is not None else [])
+
+
+def write_compressed(path, data, stats):
+    started = time.perf_counter()
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(path + ".gz", "wb") as f:
+        f.write(gz)
+    stats["gzip_bytes"] = len(gz)
+    if brotli is not None:
+        br = brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+        with open(path + ".br", "wb") as f:
+            f.write(br)
+        stats["brotli_bytes"] = len(br)
+    stats["compress_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+
+_worker_env = None
+
+
+def build_page(job):
+    """Render, minify and compress one page (runs in a worker process)."""
+    global _worker_env
+    if _worker_env is None:
+        _worker_env = make_env()
+    started = time.perf_counter()
+    html = _worker_env.get_template(job["template"]).render(**job.get("context", {}))
+    stats = {"render_ms": round((time.perf_counter() - started) * 1000, 2), "raw_bytes": len(html.encode())}
+    if job["minify"]:
+        started = time.perf_counter()
+        html = minify_html(html)
+        stats["minify_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    data = html.encode()
+    stats["bytes"] = len(data)
+    os.makedirs(os.path.dirname(job["path"]), exist_ok=True)
+    with open(job["path"], "wb") as f:
+        f.write(data)
+    write_compressed(job["path"], data, stats)
+    return stats
+
+
+def compress_asset(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    stats = {"bytes": len(data)}
+    write_compressed(path, data, stats)
+    return stats
+
+
+def write_redirects(output_dir, manifest):
     # Netlify routing: explicitly serve static subpages, then fall back to index.html
-    redirects = [
-        "/login /login/index.html 200",
-        "/login/* /login/index.html 200",
-        "/register /register/index.html 200",
-        "/register/* /register/index.html 200",
-        "/dashboard /dashboard/index.html 200",
-        "/dashboard/* /dashboard/index.html 200",
-        "/platform /platform/index.html 200",
-        "/platform/* /platform/index.html 200",
-        "/* /index.html 200",
-    ]
-    with open(os.path.join(OUTPUT_DIR, "_redirects"), "w", encoding="utf-8") as f:
+    redirects = []
+    entries = [(p.get("route"), p["output"]) for p in manifest["pages"]]
+    entries += [(a.get("route"), a["path"]) for a in manifest.get("assets", [])]
+    for route, output in entries:
+        if route:
+            redirects.append(f"{route} /{output} 200")
+            redirects.append(f"{route}/* /{output} 200")
+    redirects.append(f"/* {manifest.get('fallback', '/index.html')} 200")
+    with open(os.path.join(output_dir, "_redirects"), "w", encoding="utf-8") as f:
         f.write("\n".join(redirects) + "\n")
-    print(f"Wrote {OUTPUT_DIR}/_redirects with explicit subpage rules and SPA fallback")
+
+
+def load_build_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, BUILD_MANIFEST), encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {k: v for k, v in entries.items() if isinstance(v, dict)}
+
+
+def print_report(rows, elapsed):
+    print(f"{'output':<28}{'status':<9}{'render':>9}{'minify':>9}{'compress':>10}{'raw':>9}{'bytes':>9}{'gzip':>8}{'br':>8}")
+    for output, status, stats in rows:
+        def cell(key, unit=""):
+            value = stats.get(key)
+            return "-" if value is None else f"{value}{unit}"
+        print(f"{output:<28}{status:<9}{cell('render_ms', 'ms'):>9}{cell('minify_ms', 'ms'):>9}"
+              f"{cell('compress_ms', 'ms'):>10}{cell('raw_bytes'):>9}{cell('bytes'):>9}"
+              f"{cell('gzip_bytes'):>8}{cell('brotli_bytes'):>8}")
+    built = sum(1 for _, status, _ in rows if status != "skipped")
+    print(f"Built {built} of {len(rows)} output(s) in {elapsed * 1000:.0f}ms"
+          + ("" if brotli is not None else " (brotli not installed: no .br files)"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manifest", default=MANIFEST)
+    parser.add_argument("--output-dir", help="overrides output_dir from the manifest")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="parallel render processes")
+    parser.add_argument("--force", action="store_true", help="rebuild every page even if unchanged")
+    parser.add_argument("--no-minify", dest="minify", action="store_false", help="write pages as rendered")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with open(args.manifest, encoding="utf-8") as f:
+        manifest = json.load(f)
+    output_dir = args.output_dir or os.path.join(ROOT, manifest.get("output_dir", "static_site"))
+    os.makedirs(output_dir, exist_ok=True)
+    previous = {} if args.force else load_build_manifest(output_dir)
+    current = {}
+    env = make_env()
+
+    jobs, rows = [], []
+    for page in manifest["pages"]:
+        path = os.path.join(output_dir, page["output"])
+        digest = page_hash(env, page, args.minify)
+        current[page["output"]] = {"hash": digest, "kind": "page"}
+        if previous.get(page["output"], {}).get("hash") == digest and all(os.path.exists(p) for p in [path] + compressed_paths(path)):
+            rows.append((page["output"], "skipped", {}))
+            continue
+        jobs.append(dict(page, path=path, minify=args.minify))
+
+    if jobs:
+        workers = max(1, min(args.jobs, len(jobs)))
+        if workers == 1:
+            results = map(build_page, jobs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(build_page, jobs)
+        for job, stats in zip(jobs, results):
+            rows.append((job["output"], "built", stats))
+        if workers > 1:
+            pool.shutdown()
+
+    for entry in manifest.get("assets", []):
+        asset = entry["path"]
+        path = os.path.join(output_dir, asset)
+        if not os.path.exists(path):
+            print(f"warning: asset {asset} not found", file=sys.stderr)
+            continue
+        digest = file_hash(path)
+        current[asset] = {"hash": digest, "kind": "asset"}
+        if previous.get(asset, {}).get("hash") == digest and all(os.path.exists(p) for p in compressed_paths(path)):
+            rows.append((asset, "skipped", {}))
+        else:
+            rows.append((asset, "asset", compress_asset(path)))
+
+    # Drop outputs of entries removed from the manifest (hand-written assets
+    # themselves are kept; only their compressed siblings go)
+    for output, entry in load_build_manifest(output_dir).items():
+        if output in current:
+            continue
+        path = os.path.join(output_dir, output)
+        for stale in ([path] if entry.get("kind") == "page" else []) + [path + ".gz", path + ".br"]:
+            if os.path.exists(stale):
+                os.remove(stale)
+        print(f"Removed stale output {output}")
+
+    write_redirects(output_dir, manifest)
+    with open(os.path.join(output_dir, BUILD_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2, sort_keys=True)
+    print_report(rows, time.perf_counter() - started)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,88 @@
+"""Fail if list pages issue more SQL statements than their fixed budget.
+
+Seeds a throwaway SQLite database with enough rentals that an N+1 lazy load
+would blow well past the budget, then requests each listing through the
+Flask test client while counting statements on the engine.
+
+    python scripts/check_query_budget.py
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = tempfile.mkdtemp(prefix='cinerent-budget-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORK_DIR, 'budget.db')
+sys.path.insert(0, ROOT)
+os.chdir(WORK_DIR)  # keep app.log out of the checkout
+
+from sqlalchemy import event  # noqa: E402
+from app import app, db, bootstrap_database, Movie, Customer, Rental  # noqa: E402
+
+ROWS = 40
+
+# (path, session role, max statements per request)
+BUDGETS = [
+    ('/admin/rentals', 'admin', 2),
+    ('/admin/rentals?format=json', 'admin', 2),
+    ('/admin/movies', 'admin', 2),
+    ('/admin/customers', 'admin', 2),
+    ('/customer/rentals', 'customer', 2),
+]
+
+
+def seed():
+    with app.app_context():
+        bootstrap_database()
+        movies = [Movie(title=f'Budget Movie {i}', genre='Drama', release_year=2000) for i in range(ROWS)]
+        customers = [
+            Customer(name=f'Budget Customer {i}', email=f'budget{i}@example.com',
+                     phone='0000000000', address='-', password='-')
+            for i in range(ROWS)
+        ]
+        db.session.add_all(movies + customers)
+        db.session.flush()
+        first_customer = Customer.query.order_by(Customer.customer_id).first()
+        for i, m in enumerate(movies):
+            db.session.add(Rental(movie_id=m.movie_id, customer_id=customers[i].customer_id))
+            db.session.add(Rental(movie_id=m.movie_id, customer_id=first_customer.customer_id))
+        db.session.commit()
+        return first_customer.customer_id
+
+
+def main():
+    customer_id = seed()
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # The first request in a process also builds the catalog search index
+    app.test_client().get('/')
+
+    failures = 0
+    for path, role, budget in BUDGETS:
+        client = app.test_client()
+        with client.session_transaction() as s:
+            if role == 'admin':
+                s['admin_id'] = 1
+                s['is_admin'] = True
+            else:
+                s['customer_id'] = customer_id
+        del statements[:]
+        resp = client.get(path)
+        used = len(statements)
+        ok = resp.status_code == 200 and used <= budget
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {path}: {used} statement(s), budget {budget}, HTTP {resp.status_code}")
+        if not ok:
+            for stmt in statements:
+                print('     ' + ' '.join(stmt.split())[:160])
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
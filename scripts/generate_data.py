@@ -0,0 +1,140 @@
+"""Seed a fresh database with synthetic movies, customers and rentals.
+
+Rows go in through the app's own models and schema (bootstrap_database), in
+executemany chunks, with a fixed random seed so two runs at the same scale
+produce the same data. Every generated customer is bench-<n>@example.com with
+the password 'bench-pass' (one hash shared by all rows, since hashing a
+million passwords would dominate the run).
+
+    python scripts/generate_data.py --scale 1m --database-url sqlite:///bench-1m.db
+    python scripts/generate_data.py --rentals 50000 --database-url mysql+pymysql://user:pw@127.0.0.1/bench
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_DIR = os.getcwd()
+
+# movies, customers, rentals
+SCALES = {
+    '10k': (1_000, 1_000, 10_000),
+    '1m': (20_000, 100_000, 1_000_000),
+    '10m': (100_000, 1_000_000, 10_000_000),
+}
+GENRES = ['Action', 'Comedy', 'Drama', 'Sci-Fi', 'Thriller', 'Horror', 'Romance', 'Animation', 'Documentary', 'Fantasy']
+WORDS = ('night shadow river last city star dark return lost empire silent storm king garden iron '
+         'ghost summer winter code game heart road fire ocean glass machine house dream island secret').split()
+BENCH_PASSWORD = 'bench-pass'
+ACTIVE_SHARE = 0.05
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    parser.add_argument('--movies', type=int, help='override the scale preset')
+    parser.add_argument('--customers', type=int, help='override the scale preset')
+    parser.add_argument('--rentals', type=int, help='override the scale preset')
+    parser.add_argument('--database-url', help='defaults to sqlite:///bench-<scale>.db in the current directory')
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def insert_chunks(db, table, rows, chunk_size, label):
+    chunk, written = [], 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            db.session.execute(table.insert(), chunk)
+            db.session.commit()
+            written += len(chunk)
+            chunk = []
+            print(f'  {label}: {written}', end='\r', file=sys.stderr)
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+        written += len(chunk)
+    print(f'  {label}: {written}', file=sys.stderr)
+    return written
+
+
+def main():
+    args = parse_args()
+    movies, customers, rentals = SCALES[args.scale]
+    movies = args.movies or movies
+    customers = args.customers or customers
+    rentals = args.rentals if args.rentals is not None else rentals
+    url = args.database_url or 'sqlite:///' + os.path.join(START_DIR, f'bench-{args.scale}.db')
+    os.environ['DATABASE_URL'] = url
+    sys.path.insert(0, ROOT)
+    os.chdir(tempfile.mkdtemp(prefix='cinerent-gen-'))  # keep app.log out of the checkout
+
+    from werkzeug.security import generate_password_hash
+    from app import (app, db, bootstrap_database, reconcile_stats_counters, recalc_popularity,
+                     refresh_recommendations, Movie, Customer, Rental)
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    with app.app_context():
+        bootstrap_database()
+        if db.engine.dialect.name == 'sqlite':
+            db.session.execute(db.text('PRAGMA journal_mode=WAL'))
+            db.session.execute(db.text('PRAGMA synchronous=OFF'))
+        first_movie = (db.session.execute(db.select(db.func.max(Movie.movie_id))).scalar() or 0) + 1
+        first_customer = (db.session.execute(db.select(db.func.max(Customer.customer_id))).scalar() or 0) + 1
+        print(f'Seeding {url}: {movies} movies, {customers} customers, {rentals} rentals', file=sys.stderr)
+
+        insert_chunks(db, Movie.__table__, (
+            {
+                'movie_id': first_movie + i,
+                'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title() + f' {i}',
+                'genre': rng.choice(GENRES),
+                'release_year': rng.randint(1950, 2025),
+                'stock': rng.randint(1, 20),
+                'availability_status': 'Available',
+            } for i in range(movies)
+        ), args.chunk_size, 'movies')
+
+        password = generate_password_hash(BENCH_PASSWORD, method=app.config['PASSWORD_HASH_METHOD'])
+        insert_chunks(db, Customer.__table__, (
+            {
+                'customer_id': first_customer + i,
+                'name': f'Bench Customer {i}',
+                'email': f'bench-{i}@example.com',
+                'phone': f'555{i:07d}'[:15],
+                'address': f'{i} Benchmark Street',
+                'password': password,
+            } for i in range(customers)
+        ), args.chunk_size, 'customers')
+
+        # Skewed towards a head of popular titles, like real traffic
+        epoch = date.today() - timedelta(days=3 * 365)
+        def rental_row(i):
+            movie = first_movie + int(movies * rng.random() ** 3)
+            rented = epoch + timedelta(days=rng.randint(0, 3 * 365))
+            active = rng.random() < ACTIVE_SHARE
+            return {
+                'movie_id': movie,
+                'customer_id': first_customer + rng.randrange(customers),
+                'rental_date': rented,
+                'return_date': None if active else rented + timedelta(days=rng.randint(1, 14)),
+                'due_date': rented + timedelta(days=app.config['RENTAL_DAYS']),
+                'rental_status': 'Not Returned' if active else 'Returned',
+            }
+        if movies and customers:
+            insert_chunks(db, Rental.__table__, (rental_row(i) for i in range(rentals)), args.chunk_size, 'rentals')
+
+        reconcile_stats_counters(fix=True)
+        recalc_popularity(full=True)
+        refresh_recommendations(full=True)
+    print(f'Done in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""Drive the real Flask routes concurrently and report per-endpoint latency.
+
+Virtual users log in through the login pages (CSRF token included) and then
+loop over a weighted mix of requests until the run ends: customers hit the
+landing stats API, their dashboard and the rent endpoint, admins hit the
+rentals listing. Results are per endpoint (throughput and p50/p95/p99
+latency) and are written as JSON so runs can be diffed between commits.
+
+By default the app runs in-process against --database-url (seed it with
+scripts/generate_data.py first); --base-url drives a running server instead.
+
+    python scripts/generate_data.py --scale 10k --database-url sqlite:///bench-10k.db
+    python scripts/load_test.py --database-url sqlite:///bench-10k.db --users 8 --duration 30 --output load.json
+    python scripts/load_test.py --base-url http://127.0.0.1:5000 --users 8 --baseline load.json
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_DIR = os.getcwd()
+CSRF_RE = re.compile(r"window\.__csrf = '([^']*)'")
+
+# (endpoint name, weight)
+CUSTOMER_MIX = [('api_landing_stats', 45), ('customer_dashboard', 30), ('rent_movie', 20), ('customer_login', 5)]
+ADMIN_MIX = [('admin_rentals', 70), ('api_landing_stats', 25), ('admin_login', 5)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--database-url', help='run the app in-process against this database')
+    target.add_argument('--base-url', help='drive a running server instead, e.g. http://127.0.0.1:5000')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--admin-share', type=float, default=0.25, help='fraction of users that are admins')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds discarded at the start')
+    parser.add_argument('--customer-pool', type=int, default=1000, help='log in as bench-0 .. bench-<n-1>')
+    parser.add_argument('--movie-pool', type=int, default=1000, help='rent movie ids 1 .. n')
+    parser.add_argument('--customer-password', default='bench-pass')
+    parser.add_argument('--admin-user', default='admin')
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--token', help='bearer token for the stats API when READ_API_TOKEN is set')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--baseline', help='earlier JSON result to compare against')
+    return parser.parse_args()
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        resp = self.client.open(path, method=method, json=body, headers=headers or {})
+        data = resp.get_data()
+        resp.close()
+        return resp.status_code, data
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+
+class VirtualUser:
+    def __init__(self, client, args, rng, admin):
+        self.client = client
+        self.args = args
+        self.rng = rng
+        self.admin = admin
+        self.mix = ADMIN_MIX if admin else CUSTOMER_MIX
+        self.auth = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+
+    def login(self):
+        path = '/admin/login' if self.admin else '/customer/login'
+        status, page = self.client.request('GET', path)
+        match = CSRF_RE.search(page.decode('utf-8', 'replace'))
+        headers = {'X-CSRF-Token': match.group(1) if match else ''}
+        if self.admin:
+            body = {'username': self.args.admin_user, 'password': self.args.admin_password}
+        else:
+            body = {'email': f'bench-{self.rng.randrange(self.args.customer_pool)}@example.com',
+                    'password': self.args.customer_password}
+        return self.client.request('POST', path, body, headers)
+
+    def step(self, endpoint):
+        if endpoint in ('customer_login', 'admin_login'):
+            return self.login()
+        if endpoint == 'api_landing_stats':
+            return self.client.request('GET', '/api/landing_stats', headers=self.auth)
+        if endpoint == 'customer_dashboard':
+            return self.client.request('GET', '/customer/dashboard')
+        if endpoint == 'rent_movie':
+            return self.client.request('GET', f'/customer/rent/{self.rng.randint(1, self.args.movie_pool)}')
+        if endpoint == 'admin_rentals':
+            return self.client.request('GET', '/admin/rentals')
+        raise ValueError(endpoint)
+
+    def pick(self):
+        return self.rng.choices([name for name, _ in self.mix], weights=[w for _, w in self.mix])[0]
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    try:
+        status = fn(*args)[0]
+    except Exception:
+        status = None
+    return status, (time.perf_counter() - started) * 1000.0, started
+
+
+def run(args, make_client):
+    samples = []  # (endpoint, status, ms, started)
+    lock = threading.Lock()
+    admins = max(0, min(args.users, round(args.users * args.admin_share)))
+    window = {}
+
+    def open_window():
+        # Runs once every user has logged in
+        window['start'] = time.perf_counter() + args.warmup
+        window['end'] = window['start'] + args.duration
+
+    ready = threading.Barrier(args.users, action=open_window)
+
+    def worker(index):
+        user = VirtualUser(make_client(), args, random.Random(args.seed * 1000 + index), admin=index < admins)
+        local = [('admin_login' if user.admin else 'customer_login',) + timed(user.login)]
+        ready.wait()
+        while time.perf_counter() < window['end']:
+            endpoint = user.pick()
+            local.append((endpoint,) + timed(user.step, endpoint))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    measured = [s for s in samples if s[3] >= window['start']]
+    return summarize(measured, args.duration)
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return None
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return round(ordered[rank], 2)
+
+
+def summarize(samples, duration):
+    endpoints = {}
+    for name in sorted({s[0] for s in samples}):
+        rows = [s for s in samples if s[0] == name]
+        ordered = sorted(ms for _, _, ms, _ in rows)
+        errors = sum(1 for _, status, _, _ in rows if status is None or status >= 400)
+        endpoints[name] = {
+            'requests': len(rows),
+            'errors': errors,
+            'throughput_rps': round(len(rows) / duration, 2),
+            'mean_ms': round(sum(ordered) / len(ordered), 2),
+            'p50_ms': percentile(ordered, 50),
+            'p95_ms': percentile(ordered, 95),
+            'p99_ms': percentile(ordered, 99),
+            'max_ms': round(ordered[-1], 2),
+        }
+    total = len(samples)
+    return {
+        'total_requests': total,
+        'total_errors': sum(e['errors'] for e in endpoints.values()),
+        'throughput_rps': round(total / duration, 2),
+        'endpoints': endpoints,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path):
+    with open(os.path.join(START_DIR, baseline_path), encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')}):", file=sys.stderr)
+    print(f"{'endpoint':<20}{'rps':>10}{'Δrps':>9}{'p95 ms':>10}{'Δp95':>9}{'p99 ms':>10}{'Δp99':>9}", file=sys.stderr)
+
+    def delta(new, old):
+        return f'{(new - old) / old * 100:+.1f}%' if new is not None and old else 'n/a'
+
+    for name, cur in current['results']['endpoints'].items():
+        old = baseline.get('results', {}).get('endpoints', {}).get(name, {})
+        print(f"{name:<20}{cur['throughput_rps']:>10}{delta(cur['throughput_rps'], old.get('throughput_rps')):>9}"
+              f"{cur['p95_ms']:>10}{delta(cur['p95_ms'], old.get('p95_ms')):>9}"
+              f"{cur['p99_ms']:>10}{delta(cur['p99_ms'], old.get('p99_ms')):>9}", file=sys.stderr)
+
+
+def main():
+    args = parse_args()
+    if args.base_url:
+        target = args.base_url
+        make_client = lambda: HttpClient(args.base_url)
+    else:
+        target = args.database_url or os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(START_DIR, 'bench-10k.db')
+        os.environ['DATABASE_URL'] = target
+        sys.path.insert(0, ROOT)
+        os.chdir(tempfile.mkdtemp(prefix='cinerent-load-'))  # keep app.log out of the checkout
+        from app import app, bootstrap_database
+        import logging
+        logging.getLogger('movie_rental').setLevel(logging.WARNING)
+        with app.app_context():
+            bootstrap_database()
+        make_client = lambda: InProcessClient(app)
+        target = target.split('@')[-1]  # never record credentials
+
+    report = {
+        'commit': git_commit(),
+        'target': target,
+        'mode': 'http' if args.base_url else 'in-process',
+        'users': args.users,
+        'admin_share': args.admin_share,
+        'duration_s': args.duration,
+        'warmup_s': args.warmup,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'results': run(args, make_client),
+    }
+    text_out = json.dumps(report, indent=2)
+    print(text_out)
+    if args.output:
+        with open(os.path.join(START_DIR, args.output), 'w', encoding='utf-8') as f:
+            f.write(text_out + '\n')
+    if args.baseline:
+        compare(report, args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())